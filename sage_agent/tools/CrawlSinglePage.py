@@ -2,12 +2,59 @@ from agency_swarm.tools import BaseTool
 from pydantic import Field
 import os
 import asyncio
+import logging
 import traceback
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=64)
+def _cached_run_config(is_docs: bool, cache_mode: Any, wait_selector: Optional[str], process_iframes: bool) -> Any:
+    """
+    Builds a CrawlerRunConfig. Only a handful of distinct configurations exist
+    (site type x cache mode x wait selector), so they are built once and reused
+    across retries and tool invocations. The markdown generator is stateless
+    and shared by every config built here.
+    """
+    from crawl4ai import CrawlerRunConfig
+    from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+    markdown_generator = DefaultMarkdownGenerator()
+
+    if is_docs:
+        # Documentation site configuration
+        return CrawlerRunConfig(
+            cache_mode=cache_mode,
+            stream=True,
+            markdown_generator=markdown_generator,
+            wait_for=wait_selector,
+            wait_until='domcontentloaded',
+            page_timeout=30000,  # 30 seconds
+            delay_before_return_html=0.5,  # 500ms for JS rendering
+            wait_for_images=False,
+            scan_full_page=True,
+            exclude_all_images=False,
+            remove_overlay_elements=True,
+            process_iframes=process_iframes
+        )
+
+    # Regular site configuration
+    return CrawlerRunConfig(
+        cache_mode=cache_mode,
+        stream=True,
+        markdown_generator=markdown_generator,
+        wait_until='domcontentloaded',
+        page_timeout=45000,  # 45 seconds
+        delay_before_return_html=0.3,  # 300ms delay
+        scan_full_page=True
+    )
+
+
 class CrawlSinglePage(BaseTool):
     """
     A tool that crawls a single web page and extracts its content as markdown.
@@ -31,31 +78,49 @@ class CrawlSinglePage(BaseTool):
         description="Number of retry attempts if crawling fails. Uses exponential backoff between retries.",
     )
 
-    def _get_wait_selector_for_docs(self, url: str) -> str:
+    urls: List[str] = Field(
+        default_factory=list,
+        description="Optional additional URLs to crawl in the same browser session. When provided, all URLs (including `url`) are crawled as a batch and the result contains one entry per URL.",
+    )
+
+    max_concurrent: int = Field(
+        default=5,
+        description="Maximum number of pages crawled concurrently in batch mode when the crawler has no native batch support.",
+    )
+
+    process_iframes: bool = Field(
+        default=False,
+        description="Whether to load and extract iframe content. Disabled by default since embedded widgets (videos, sandboxes) rarely add useful markdown. Frameworks known to host content in iframes (e.g. Confluence, Zendesk) enable it automatically.",
+    )
+
+    def _get_wait_selector_for_docs(self, url: str) -> Tuple[str, bool]:
         """
         Identifies the type of documentation framework based on URL patterns
-        and returns appropriate CSS selectors to wait for content to load.
+        and returns appropriate CSS selectors to wait for content to load,
+        along with whether the framework hosts its content inside iframes.
         """
         url_lower = url.lower()
         
-        # Map of documentation frameworks to their CSS selectors
+        # Map of documentation frameworks to their CSS selectors and iframe needs
         doc_frameworks = {
-            'docusaurus': '.markdown, .theme-doc-markdown, article',
-            'vitepress': '.VPDoc, .vp-doc, .content',
-            'gitbook': '.markdown-section, .page-wrapper',
-            'mkdocs': '.md-content, article',
-            'docsify': '#main, .markdown-section',
-            'copilotkit': 'div[class*="content"], div[class*="doc"], #__next',
-            'milkdown': 'main, article, .prose, [class*="content"]',
+            'docusaurus': ('.markdown, .theme-doc-markdown, article', False),
+            'vitepress': ('.VPDoc, .vp-doc, .content', False),
+            'gitbook': ('.markdown-section, .page-wrapper', False),
+            'mkdocs': ('.md-content, article', False),
+            'docsify': ('#main, .markdown-section', False),
+            'copilotkit': ('div[class*="content"], div[class*="doc"], #__next', False),
+            'milkdown': ('main, article, .prose, [class*="content"]', False),
+            'confluence': ('#main-content, .wiki-content', True),
+            'zendesk': ('.article-body, article', True),
         }
         
         # Check for framework-specific patterns in URL
-        for framework, selector in doc_frameworks.items():
+        for framework, (selector, needs_iframes) in doc_frameworks.items():
             if framework in url_lower:
-                return selector
+                return selector, needs_iframes
         
         # Generic fallback for documentation sites
-        return 'body'
+        return 'body', False
 
     def _transform_url(self, url: str) -> str:
         """
@@ -67,13 +132,51 @@ class CrawlSinglePage(BaseTool):
             return url.replace('github.com', 'raw.githubusercontent.com').replace('/blob/', '/')
         return url
 
-    async def _crawl_page(self) -> Dict[str, Any]:
+    def _build_config(self, cache_mode: Any, url: str) -> Any:
+        """
+        Returns the (cached) CrawlerRunConfig for a URL based on the site type.
+        """
+        if self.is_documentation_site:
+            wait_selector, needs_iframes = self._get_wait_selector_for_docs(url)
+            return _cached_run_config(True, cache_mode, wait_selector, self.process_iframes or needs_iframes)
+        return _cached_run_config(False, cache_mode, None, False)
+
+    def _validate_result(self, result: Any, original_url: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Validates a crawl result. Returns the success payload, or None together
+        with the reason the content was rejected.
+        """
+        if result.success and result.markdown and len(result.markdown.strip()) >= 50:
+            # Successfully crawled with valid content
+            html = getattr(result, 'html', '') or ''
+            title = getattr(result, 'title', None) or 'Untitled'
+            links_obj = getattr(result, 'links', None) or {}
+            return {
+                "success": True,
+                "url": original_url,
+                "markdown": result.markdown,
+                "html": html,
+                "title": title,
+                "links": links_obj.get('internal', []) + links_obj.get('external', []),
+                "content_length": len(result.markdown)
+            }, ""
+
+        # Content validation failed
+        error_msg = "Content validation failed"
+        if not result.success:
+            error_msg = "Crawl was not successful"
+        elif not result.markdown:
+            error_msg = "No markdown content extracted"
+        elif len(result.markdown.strip()) < 50:
+            error_msg = f"Content too short ({len(result.markdown.strip())} chars)"
+        return None, error_msg
+
+    async def _crawl_page(self, url: Optional[str] = None, start_attempt: int = 0) -> Dict[str, Any]:
         """
         Internal async method that performs the actual crawling with retry logic.
         """
         try:
-            from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
-            from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+            from crawl4ai import AsyncWebCrawler, CacheMode
         except ImportError as e:
             return {
                 "success": False,
@@ -81,88 +184,40 @@ class CrawlSinglePage(BaseTool):
             }
 
         # Step 1: Transform URL if needed (e.g., GitHub URLs)
-        transformed_url = self._transform_url(self.url)
-        original_url = self.url
+        original_url = url or self.url
+        transformed_url = self._transform_url(original_url)
         
-        # Step 2: Initialize crawler components
-        markdown_generator = DefaultMarkdownGenerator()
-        
-        # Step 3: Attempt crawling with retry logic
-        for attempt in range(self.retry_count):
+        # Step 2: Attempt crawling with retry logic
+        for attempt in range(start_attempt, self.retry_count):
             try:
                 async with AsyncWebCrawler(verbose=False) as crawler:
-                    # Step 4: Configure cache mode - first attempt uses cache, subsequent attempts bypass it
+                    # Step 3: Configure cache mode - first attempt uses cache, subsequent attempts bypass it
                     cache_mode = CacheMode.ENABLED if attempt == 0 else CacheMode.BYPASS
                     
-                    # Step 5: Build crawler configuration based on site type
-                    if self.is_documentation_site:
-                        # Documentation site configuration
-                        wait_selector = self._get_wait_selector_for_docs(transformed_url)
-                        
-                        config = CrawlerRunConfig(
-                            cache_mode=cache_mode,
-                            stream=True,
-                            markdown_generator=markdown_generator,
-                            wait_for=wait_selector,
-                            wait_until='domcontentloaded',
-                            page_timeout=30000,  # 30 seconds
-                            delay_before_return_html=0.5,  # 500ms for JS rendering
-                            wait_for_images=False,
-                            scan_full_page=True,
-                            exclude_all_images=False,
-                            remove_overlay_elements=True,
-                            process_iframes=True
-                        )
-                    else:
-                        # Regular site configuration
-                        config = CrawlerRunConfig(
-                            cache_mode=cache_mode,
-                            stream=True,
-                            markdown_generator=markdown_generator,
-                            wait_until='domcontentloaded',
-                            page_timeout=45000,  # 45 seconds
-                            delay_before_return_html=0.3,  # 300ms delay
-                            scan_full_page=True
-                        )
+                    # Step 4: Build crawler configuration based on site type
+                    config = self._build_config(cache_mode, transformed_url)
                     
-                    # Step 6: Execute the crawl
+                    # Step 5: Execute the crawl
                     result = await crawler.arun(
                         url=transformed_url,
                         config=config
                     )
                     
-                    # Step 7: Validate the result
-                    if result.success and result.markdown and len(result.markdown.strip()) >= 50:
-                        # Successfully crawled with valid content
+                    # Step 6: Validate the result
+                    payload, error_msg = self._validate_result(result, original_url)
+                    if payload is not None:
+                        return payload
+                    
+                    # Retry with exponential backoff
+                    if attempt < self.retry_count - 1:
+                        wait_time = 2 ** attempt
+                        await asyncio.sleep(wait_time)
+                        continue
+                    else:
                         return {
-                            "success": True,
-                            "url": original_url,
-                            "markdown": result.markdown,
-                            "html": result.html if hasattr(result, 'html') else "",
-                            "title": result.title if hasattr(result, 'title') and result.title else "Untitled",
-                            "links": result.links.get('internal', []) + result.links.get('external', []) if hasattr(result, 'links') and result.links else [],
-                            "content_length": len(result.markdown)
+                            "success": False,
+                            "error": f"{error_msg} after {self.retry_count} attempts"
                         }
-                    else:
-                        # Content validation failed
-                        error_msg = "Content validation failed"
-                        if not result.success:
-                            error_msg = "Crawl was not successful"
-                        elif not result.markdown:
-                            error_msg = "No markdown content extracted"
-                        elif len(result.markdown.strip()) < 50:
-                            error_msg = f"Content too short ({len(result.markdown.strip())} chars)"
-                        
-                        # Retry with exponential backoff
-                        if attempt < self.retry_count - 1:
-                            wait_time = 2 ** attempt
-                            await asyncio.sleep(wait_time)
-                            continue
-                        else:
-                            return {
-                                "success": False,
-                                "error": f"{error_msg} after {self.retry_count} attempts"
-                            }
                             
             except Exception as e:
                 # Handle error message encoding safely
@@ -190,6 +245,93 @@ class CrawlSinglePage(BaseTool):
             "error": f"Failed to crawl {original_url} after all retry attempts"
         }
 
+    async def _crawl_many(self, urls: List[str]) -> Dict[str, Any]:
+        """
+        Crawls several URLs in a single browser session. Uses Crawl4AI's native
+        arun_many when available and falls back to a semaphore-bounded gather.
+        URLs that fail the first pass go through the regular retry logic.
+        """
+        try:
+            from crawl4ai import AsyncWebCrawler, CacheMode
+        except ImportError as e:
+            return {
+                "success": False,
+                "error": f"Failed to import Crawl4AI. Please ensure crawl4ai>=0.7.0 is installed. Error: {str(e)}"
+            }
+
+        # Several inputs can transform to the same URL (e.g. GitHub blob and raw links)
+        originals: Dict[str, List[str]] = {}
+        for url in urls:
+            originals.setdefault(self._transform_url(url), []).append(url)
+        payloads: Dict[str, Dict[str, Any]] = {}
+
+        # Step 1: Group URLs by configuration so each group shares one config
+        groups: Dict[Tuple[str, bool], List[str]] = {}
+        for transformed_url in originals:
+            key = self._get_wait_selector_for_docs(transformed_url) if self.is_documentation_site else ('', False)
+            groups.setdefault(key, []).append(transformed_url)
+
+        # Step 2: First pass over all URLs with the cache enabled
+        try:
+            async with AsyncWebCrawler(verbose=False) as crawler:
+                for group_urls in groups.values():
+                    config = self._build_config(CacheMode.ENABLED, group_urls[0])
+
+                    if hasattr(crawler, 'arun_many'):
+                        results = await crawler.arun_many(urls=group_urls, config=config)
+                    else:
+                        semaphore = asyncio.Semaphore(self.max_concurrent)
+
+                        async def crawl_one(target: str) -> Any:
+                            async with semaphore:
+                                return await crawler.arun(url=target, config=config)
+
+                        results = await asyncio.gather(
+                            *(crawl_one(target) for target in group_urls),
+                            return_exceptions=True
+                        )
+
+                    # Streaming configs yield results as they complete
+                    if hasattr(results, '__aiter__'):
+                        results = [result async for result in results]
+
+                    for result in results:
+                        if isinstance(result, BaseException):
+                            continue
+                        for original_url in originals.get(getattr(result, 'url', None), []):
+                            payload, _ = self._validate_result(result, original_url)
+                            if payload is not None:
+                                payloads[original_url] = payload
+        except Exception:
+            # Anything not crawled successfully is retried individually below
+            logger.warning("Batch crawl failed, retrying remaining URLs individually", exc_info=True)
+
+        # Step 3: Retry failures individually, continuing from the second attempt; each
+        # retry opens its own browser, so at most max_concurrent run at once
+        failed = [url for url in urls if url not in payloads]
+        if failed:
+            if self.retry_count > 1:
+                await asyncio.sleep(1)
+                retry_semaphore = asyncio.Semaphore(self.max_concurrent)
+                
+                async def retry_one(url: str) -> Dict[str, Any]:
+                    async with retry_semaphore:
+                        return await self._crawl_page(url, start_attempt=1)
+                
+                retried = await asyncio.gather(*(retry_one(url) for url in failed))
+            else:
+                retried = [
+                    {"success": False, "error": f"Failed to crawl {url} after {self.retry_count} attempts"}
+                    for url in failed
+                ]
+            payloads.update(zip(failed, retried))
+
+        results_list = [payloads[url] for url in urls]
+        return {
+            "success": all(result.get("success") for result in results_list),
+            "results": results_list
+        }
+
     def run(self):
         """
         Crawls a single web page and returns the extracted content.
@@ -198,11 +340,16 @@ class CrawlSinglePage(BaseTool):
             A JSON string containing the crawl result with the following structure:
             - On success: {"success": true, "url": "...", "markdown": "...", "html": "...", "title": "...", "links": [...], "content_length": 123}
             - On failure: {"success": false, "error": "error message"}
+            - In batch mode (`urls` provided): {"success": bool, "results": [<one of the above per URL>]}
         """
         import json
         
         # Step 1: Run the async crawling method
-        result = asyncio.run(self._crawl_page())
+        if self.urls:
+            all_urls = list(dict.fromkeys([self.url, *self.urls]))
+            result = asyncio.run(self._crawl_many(all_urls))
+        else:
+            result = asyncio.run(self._crawl_page())
         
         # Step 2: Return the result as a JSON string (ensure_ascii=True for Windows compatibility)
         return json.dumps(result, indent=2, ensure_ascii=True)
@@ -3,15 +3,255 @@ from pydantic import Field
 import os
 import json
 import re
+import bisect
+import gzip
+import hashlib
+import html
+import pickle
+import sys
 import requests
+from requests.adapters import HTTPAdapter
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple, ClassVar
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Literal, Optional, Tuple, ClassVar
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 
+# Add document_processor utils path for accessing shared utilities
+_DOC_PROCESSOR_UTILS = Path(__file__).parent.parent.parent / "document_processor" / "tools" / "utils"
+if str(_DOC_PROCESSOR_UTILS) not in sys.path:
+    sys.path.insert(0, str(_DOC_PROCESSOR_UTILS))
+
+# A broken model loader must not stop the tool from importing; run() reports the
+# failure in its JSON result instead
+try:
+    from model_loader import get_tokenizer, get_model_config
+    _MODEL_LOADER_ERROR = None
+except Exception as e:
+    get_tokenizer = get_model_config = None
+    _MODEL_LOADER_ERROR = e
+
 load_dotenv()
 
+# Prefer orjson for serialization when available, falling back to the stdlib
+try:
+    import orjson
+
+    def _dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def _dumps(obj: Any) -> str:
+        return _dumps_bytes(obj).decode('utf-8')
+
+    def _dumps_line(obj: Any) -> bytes:
+        return orjson.dumps(obj) + b"\n"
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+    def _dumps_bytes(obj: Any) -> bytes:
+        return _dumps(obj).encode('utf-8')
+
+    def _dumps_line(obj: Any) -> bytes:
+        return (json.dumps(obj, ensure_ascii=False) + "\n").encode('utf-8')
+
+def _find_tmpfs_dir() -> Optional[str]:
+    """
+    Returns '/tmp' when it is a RAM-backed tmpfs mount, otherwise None so the
+    platform default temp directory is used.
+    """
+    try:
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 3 and fields[1] == '/tmp' and fields[2] == 'tmpfs':
+                    return '/tmp'
+    except OSError:
+        pass
+    return None
+
+
+# Temp directory for downloaded .txt files (tmpfs when available)
+_TMPFS_DIR = _find_tmpfs_dir()
+
+# Precompiled patterns for _sanitize_filename
+_PROTOCOL_RE = re.compile(r'^https?://')
+_UNSAFE_CHARS_RE = re.compile(r'(?:[^\w\-.]|_)+')
+
+# Markdown renderer for the HTML export fallback (optional dependency)
+try:
+    from markdown_it import MarkdownIt
+    _MARKDOWN_RENDERER = MarkdownIt('commonmark', {'html': False}).enable(['table', 'strikethrough'])
+except ImportError:
+    _MARKDOWN_RENDERER = None
+
+# Markdown ATX headings, used by the fast chunking path
+_MD_HEADING_RE = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t#]*$', re.MULTILINE)
+
+# Content-Type substrings mapped to formats, checked in priority order
+_CONTENT_TYPE_FORMATS = (
+    ('pdf', 'PDF'),
+    ('html', 'HTML'),
+    ('word', 'DOCX'),
+    ('docx', 'DOCX'),
+    ('powerpoint', 'PPTX'),
+    ('pptx', 'PPTX'),
+    ('excel', 'XLSX'),
+    ('xlsx', 'XLSX'),
+    ('markdown', 'MD'),
+    ('text/plain', 'TEXT'),
+)
+
+# Shared HTTP session so connections are reused across requests and invocations
+_REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.mount('http://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+_HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=16, pool_maxsize=16))
+
+# Bumped whenever the layout of cached extractions changes
+_CACHE_FORMAT_VERSION = "2"
+
+# Heavy objects shared across tool invocations (model weights, pipelines)
+_docling: Optional[Tuple[Any, Any]] = None
+_CONVERTER: Optional[Any] = None
+_TOKENIZER_CACHE: Dict[Tuple[str, str], Any] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _load_docling() -> Tuple[Any, Any]:
+    """
+    Imports Docling once and returns (DocumentConverter, HybridChunker).
+    
+    Raises:
+        ImportError: If docling is not installed
+    """
+    global _docling
+    if _docling is None:
+        from docling.document_converter import DocumentConverter
+        from docling.chunking import HybridChunker
+        _docling = (DocumentConverter, HybridChunker)
+    return _docling
+
+
+def _get_converter() -> Any:
+    """
+    Returns the shared DocumentConverter, creating it on first use.
+    """
+    global _CONVERTER
+    if _CONVERTER is None:
+        with _CACHE_LOCK:
+            if _CONVERTER is None:
+                DocumentConverter, _ = _load_docling()
+                _CONVERTER = DocumentConverter()
+    return _CONVERTER
+
+
+def _get_cached_tokenizer(model_name: str, model_source: str) -> Any:
+    """
+    Returns the shared tokenizer for (model_name, model_source), loading it on first use.
+    """
+    key = (model_name, model_source)
+    tokenizer = _TOKENIZER_CACHE.get(key)
+    if tokenizer is None:
+        with _CACHE_LOCK:
+            tokenizer = _TOKENIZER_CACHE.get(key)
+            if tokenizer is None:
+                tokenizer = get_tokenizer(model_name=model_name, model_source=model_source)
+                _TOKENIZER_CACHE[key] = tokenizer
+    return tokenizer
+
+
+def _render_markdown_html(url: str, markdown: str) -> str:
+    """
+    Renders markdown to a standalone HTML page, used when Docling's HTML export fails.
+    Falls back to a preformatted block when markdown-it-py is not installed.
+    """
+    title = html.escape(url)
+    if _MARKDOWN_RENDERER is not None:
+        body = _MARKDOWN_RENDERER.render(markdown)
+    else:
+        body = f"""<h1>Content from: {title}</h1>
+    <p><em>Note: HTML export not available, showing markdown content</em></p>
+    <pre>{html.escape(markdown)}</pre>"""
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+</head>
+<body>
+    {body}
+</body>
+</html>"""
+
+
+@dataclass
+class _TextChunk:
+    """
+    Minimal chunk compatible with the parts of Docling's DocChunk used by this tool.
+    """
+    text: str
+    meta: SimpleNamespace
+
+
+def _fast_chunk_markdown(markdown: str, tokenizer: Any, max_tokens: int) -> Iterator[_TextChunk]:
+    """
+    Splits markdown into chunks of at most max_tokens using a single tokenizer pass.
+    
+    Chunk boundaries are found by bisecting the token offset map, preferring to
+    break at the last newline in the second half of each window. Each chunk is
+    tagged with the markdown heading hierarchy in effect where it starts.
+    """
+    encoding = tokenizer(markdown, return_offsets_mapping=True, add_special_tokens=False, truncation=False)
+    offsets = encoding['offset_mapping']
+    if not offsets:
+        return
+    token_starts = [start for start, _ in offsets]
+    
+    # Heading positions and levels, in document order
+    headings = [(m.start(), len(m.group(1)), m.group(2).strip()) for m in _MD_HEADING_RE.finditer(markdown)]
+    heading_index = 0
+    stack: Dict[int, str] = {}
+    
+    start_token = 0
+    total_tokens = len(offsets)
+    while start_token < total_tokens:
+        end_token = min(start_token + max_tokens, total_tokens)
+        start_char = offsets[start_token][0]
+        end_char = offsets[end_token - 1][1]
+        
+        # Prefer breaking at a newline in the second half of the window
+        if end_token < total_tokens:
+            midpoint = offsets[start_token + (end_token - start_token) // 2][0]
+            newline = markdown.rfind('\n', midpoint, end_char)
+            if newline != -1:
+                break_token = bisect.bisect_right(token_starts, newline, start_token, end_token)
+                if break_token > start_token:
+                    end_token = break_token
+                    end_char = offsets[end_token - 1][1]
+        
+        # Advance the heading stack to the start of the chunk
+        while heading_index < len(headings) and headings[heading_index][0] <= start_char:
+            _, level, title = headings[heading_index]
+            stack = {lvl: t for lvl, t in stack.items() if lvl < level}
+            stack[level] = title
+            heading_index += 1
+        
+        text = markdown[start_char:end_char].strip()
+        if text:
+            chunk_headings = [stack[lvl] for lvl in sorted(stack)]
+            yield _TextChunk(text=text, meta=SimpleNamespace(headings=chunk_headings, doc_items=[]))
+        
+        start_token = end_token
+
+
 class ExtractAndChunkWebsite(BaseTool):
     """
     A tool that extracts website content using Docling and chunks it using the HybridChunker.
@@ -42,6 +282,31 @@ class ExtractAndChunkWebsite(BaseTool):
         default=True,
         description="Whether to merge peer chunks in the hybrid chunker. Default is True.",
     )
+    
+    use_cache: bool = Field(
+        default=True,
+        description="Whether to reuse previously extracted content and chunks when the source is unchanged (same ETag/Last-Modified or content hash) and the chunking settings match. Only applies when the URL was probed, so URLs with a known non-.txt extension or skip_url_check are always extracted fresh. Default is True.",
+    )
+    
+    fast_chunking: bool = Field(
+        default=False,
+        description="Whether to chunk the exported markdown with a single batched tokenizer pass instead of the HybridChunker. Much faster on long documents but splits on token counts and markdown headings rather than Docling's document structure, so page numbers are not available. Requires a fast HuggingFace tokenizer; otherwise the HybridChunker is used. Default is False.",
+    )
+    
+    deduplicate_chunks: bool = Field(
+        default=False,
+        description="Whether to skip writing chunk files whose text is identical to an earlier chunk (e.g. repeated navigation or footer boilerplate). Duplicates reference the first occurrence's file. Default is False, so every chunk gets its own file.",
+    )
+    
+    skip_url_check: bool = Field(
+        default=False,
+        description="Whether to skip the network accessibility check before extraction. Useful for batch workflows with trusted URLs; URLs without a known extension are assumed to be HTML. Default is False.",
+    )
+    
+    output_mode: Literal["files", "jsonl"] = Field(
+        default="files",
+        description="How chunks are persisted. 'files' writes one .txt file per chunk; 'jsonl' writes all chunks to a single gzip-compressed JSONL file. Default is 'files'.",
+    )
 
     # Docling supported formats - ClassVar so Pydantic doesn't treat it as a field
     SUPPORTED_FORMATS: ClassVar[Dict[str, str]] = {
@@ -66,7 +331,9 @@ class ExtractAndChunkWebsite(BaseTool):
         '.txt': 'TEXT'  # Will be converted to MD before processing
     }
     
-    def _sanitize_filename(self, url: str) -> str:
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _sanitize_filename(url: str) -> str:
         """
         Converts a URL to a safe filename by removing protocol and replacing special characters.
         
@@ -76,33 +343,29 @@ class ExtractAndChunkWebsite(BaseTool):
         Returns:
             A sanitized filename string
         """
-        # Step 1: Remove protocol (http://, https://)
-        filename = re.sub(r'^https?://', '', url)
-        
-        # Step 2: Replace special characters with underscores
-        filename = re.sub(r'[^\w\-.]', '_', filename)
-        
-        # Step 3: Remove consecutive underscores
-        filename = re.sub(r'_+', '_', filename)
-        
-        # Step 4: Remove trailing underscores and dots
-        filename = filename.strip('_.')
-        
-        return filename
+        # Remove protocol, collapse runs of special characters into a single
+        # underscore, then strip leading/trailing underscores and dots
+        return _UNSAFE_CHARS_RE.sub('_', _PROTOCOL_RE.sub('', url)).strip('_.')
     
-    def _check_url_and_format(self, url: str) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _check_url_and_format(self, url: str) -> Tuple[bool, Optional[str], Optional[requests.Response], Optional[str]]:
         """
         Checks if the URL is accessible and determines its format.
         
+        A single streaming GET is issued; only the headers are read here so the
+        still-open response can be reused to download the body when needed.
+        
         Args:
             url: The URL to check
             
         Returns:
-            A tuple of (is_valid, format_type, error_message)
+            A tuple of (is_valid, format_type, response, error_message)
             - is_valid: True if URL is accessible and format is supported
             - format_type: The detected format (e.g., 'PDF', 'HTML', 'TEXT')
+            - response: The open streaming response (caller must close it), None on failure
+              or when the format was determined without a network probe
             - error_message: Error message if validation fails, None otherwise
         """
+        response = None
         try:
             # Step 1: Parse URL to get file extension
             parsed_url = urlparse(url)
@@ -112,29 +375,29 @@ class ExtractAndChunkWebsite(BaseTool):
             _, ext = os.path.splitext(path)
             ext = ext.lower()
             
-            # Step 2: Make a HEAD request to check if URL is accessible
-            print(f"Checking URL accessibility: {url}")
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
+            # A known extension is authoritative; let Docling surface any fetch errors.
+            # .txt still needs its body downloaded, so it goes through the probe.
+            if ext in self.SUPPORTED_FORMATS and ext != '.txt':
+                format_type = self.SUPPORTED_FORMATS[ext]
+                print(f"Detected format from extension: {format_type} ({ext})")
+                return True, format_type, None, None
+            
+            if self.skip_url_check:
+                format_type = self.SUPPORTED_FORMATS.get(ext, 'HTML')
+                print(f"Skipping URL check, assuming format: {format_type}")
+                return True, format_type, None, None
             
+            # Step 2: Make a streaming GET request to check if URL is accessible
+            print(f"Checking URL accessibility: {url}")
             try:
-                response = requests.head(url, headers=headers, timeout=10, allow_redirects=True)
-                
-                # If HEAD fails, try GET with small range
-                if response.status_code >= 400:
-                    response = requests.get(url, headers=headers, timeout=10, stream=True)
-                    
+                response = _HTTP_SESSION.get(url, headers=_REQUEST_HEADERS, timeout=10, stream=True, allow_redirects=True)
             except requests.exceptions.RequestException as e:
-                # Try GET if HEAD fails completely
-                try:
-                    response = requests.get(url, headers=headers, timeout=10, stream=True)
-                except Exception as get_error:
-                    return False, None, f"URL is not accessible: {str(get_error)}"
+                return False, None, None, f"URL is not accessible: {str(e)}"
             
             # Step 3: Check if request was successful
             if response.status_code >= 400:
-                return False, None, f"URL returned error status code: {response.status_code}"
+                response.close()
+                return False, None, None, f"URL returned error status code: {response.status_code}"
             
             # Step 4: Determine format from extension or content-type
             content_type = response.headers.get('Content-Type', '').lower()
@@ -143,42 +406,35 @@ class ExtractAndChunkWebsite(BaseTool):
             if ext in self.SUPPORTED_FORMATS:
                 format_type = self.SUPPORTED_FORMATS[ext]
                 print(f"Detected format from extension: {format_type} ({ext})")
-                return True, format_type, None
+                return True, format_type, response, None
             
             # Try to determine from content-type
-            if 'pdf' in content_type:
-                return True, 'PDF', None
-            elif 'html' in content_type:
-                return True, 'HTML', None
-            elif 'word' in content_type or 'docx' in content_type:
-                return True, 'DOCX', None
-            elif 'powerpoint' in content_type or 'pptx' in content_type:
-                return True, 'PPTX', None
-            elif 'excel' in content_type or 'xlsx' in content_type:
-                return True, 'XLSX', None
-            elif 'markdown' in content_type:
-                return True, 'MD', None
-            elif 'text/plain' in content_type:
-                return True, 'TEXT', None
+            for marker, format_type in _CONTENT_TYPE_FORMATS:
+                if marker in content_type:
+                    return True, format_type, response, None
             
             # If no extension and content-type doesn't help, assume HTML for web pages
             if not ext or ext == '/':
                 print("No file extension detected, assuming HTML web page")
-                return True, 'HTML', None
+                return True, 'HTML', response, None
             
             # Unknown format
+            response.close()
             supported_list = ', '.join(self.SUPPORTED_FORMATS.keys())
-            return False, None, f"Unsupported format '{ext}'. Supported formats: {supported_list}"
+            return False, None, None, f"Unsupported format '{ext}'. Supported formats: {supported_list}"
             
         except Exception as e:
-            return False, None, f"Error checking URL: {str(e)}"
+            if response is not None:
+                response.close()
+            return False, None, None, f"Error checking URL: {str(e)}"
     
-    def _download_and_convert_txt_to_md(self, url: str) -> Tuple[bool, Optional[str], Optional[str]]:
+    def _download_and_convert_txt_to_md(self, url: str, response: Optional[requests.Response] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Downloads a .txt file and converts it to .md format.
         
         Args:
             url: The URL of the .txt file
+            response: An already open streaming response for the URL to read the body from
             
         Returns:
             A tuple of (success, md_file_path, error_message)
@@ -186,31 +442,199 @@ class ExtractAndChunkWebsite(BaseTool):
         try:
             print(f"Downloading .txt file from: {url}")
             
-            # Step 1: Download the .txt file
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-            
-            # Step 2: Create a temporary .md file
-            with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.md', delete=False) as tmp_file:
-                # Write the content as markdown
-                # Add a header with the source URL
-                tmp_file.write(f"# Content from {url}\n\n")
-                tmp_file.write("---\n\n")
-                
-                # Write the actual content
-                content = response.text
-                tmp_file.write(content)
+            # Step 1: Download the .txt file, reusing the open response if provided
+            if response is None:
+                response = _HTTP_SESSION.get(url, headers=_REQUEST_HEADERS, timeout=30, stream=True)
+            with response:
+                response.raise_for_status()
+                response.encoding = response.encoding or 'utf-8'
                 
-                tmp_file_path = tmp_file.name
+                # Step 2: Stream the content into a temporary .md file
+                with tempfile.NamedTemporaryFile(mode='w', encoding='utf-8', suffix='.md', delete=False, dir=_TMPFS_DIR) as tmp_file:
+                    # Write the content as markdown
+                    # Add a header with the source URL
+                    tmp_file.write(f"# Content from {url}\n\n")
+                    tmp_file.write("---\n\n")
+                    
+                    # Write the actual content as it arrives
+                    for chunk in response.iter_content(chunk_size=65536, decode_unicode=True):
+                        tmp_file.write(chunk)
+                    
+                    tmp_file_path = tmp_file.name
             
             print(f"Converted .txt to .md: {tmp_file_path}")
             return True, tmp_file_path, None
             
         except Exception as e:
             return False, None, f"Failed to download and convert .txt file: {str(e)}"
+    
+    def _get_source_validator(self, url: str, local_path: Optional[str] = None, headers: Optional[Any] = None) -> Optional[str]:
+        """
+        Returns a string that changes whenever the source content changes.
+        
+        Args:
+            url: The URL of the source
+            local_path: Path to an already downloaded copy of the source, if any
+            headers: Response headers already fetched for the URL, if any
+            
+        Returns:
+            A content hash for local copies, the ETag or Last-Modified header
+            for remote sources, or None if the source cannot be validated
+        """
+        if local_path:
+            digest = hashlib.sha256()
+            with open(local_path, 'rb') as f:
+                for block in iter(lambda: f.read(65536), b''):
+                    digest.update(block)
+            return f"sha256:{digest.hexdigest()}"
+        
+        if headers is None:
+            try:
+                response = _HTTP_SESSION.head(url, headers=_REQUEST_HEADERS, timeout=10, allow_redirects=True)
+                if response.status_code >= 400:
+                    return None
+                headers = response.headers
+            except requests.exceptions.RequestException:
+                return None
+        
+        etag = headers.get('ETag')
+        if etag:
+            return f"etag:{etag}"
+        last_modified = headers.get('Last-Modified')
+        if last_modified:
+            return f"last-modified:{last_modified}"
+        return None
+    
+    def _get_cache_key(self, validator: str, tokenizer_model: str, model_source: str, max_tokens: int) -> str:
+        """
+        Builds the extraction cache key from the source validator and chunking settings.
+        """
+        raw = "|".join([
+            _CACHE_FORMAT_VERSION, self.url, validator, tokenizer_model, model_source,
+            str(max_tokens), str(self.merge_peers), str(self.fast_chunking),
+        ])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _load_cached_extraction(self, cache_dir: str, cache_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Loads a cached extraction, returning None on a miss or unreadable entry.
+        """
+        cache_path = os.path.join(cache_dir, f"{cache_key}.pkl")
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Warning: Ignoring unreadable cache entry {cache_path}: {e}")
+            return None
+    
+    def _store_cached_extraction(self, cache_dir: str, cache_key: str, payload: Dict[str, Any]) -> None:
+        """
+        Atomically writes an extraction to the cache. Failures are non-fatal.
+        """
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_path = os.path.join(cache_dir, f"{cache_key}.pkl")
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"Warning: Failed to write extraction cache: {e}")
+
+    @staticmethod
+    def _extract_chunk_meta(chunk: Any) -> Dict[str, Any]:
+        """
+        Extracts the metadata shared by the chunk file header and the summary JSON.
+        
+        Returns:
+            A dict with the chunk's headings, sorted unique page numbers and text length
+        """
+        meta = chunk.meta
+        doc_items = getattr(meta, 'doc_items', None) or []
+        page_numbers = sorted(set(
+            page_no
+            for item in doc_items
+            for prov in item.prov
+            if (page_no := getattr(prov, 'page_no', None)) is not None
+        ))
+        return {
+            "headings": getattr(meta, 'headings', None) or [],
+            "page_numbers": page_numbers,
+            "text_length": len(chunk.text),
+        }
+    
+    def _write_chunk(self, i: int, text: str, chunk_meta: Dict[str, Any], path_prefix: str, total: int) -> str:
+        """
+        Writes a single chunk with its metadata header to its own file.
+        
+        Returns:
+            The path of the written chunk file
+        """
+        chunk_filename = f"{path_prefix}_chunk_{i+1}.txt"
+        # Write chunk metadata
+        parts = [
+            f"# Chunk {i+1} of {total}\n",
+            f"# Source URL: {self.url}\n",
+            f"# Chunk Index: {i+1}\n",
+        ]
+        
+        # Write chunk headings if available
+        if chunk_meta["headings"]:
+            parts.append(f"# Headings: {' > '.join(chunk_meta['headings'])}\n")
+        
+        # Write page numbers if available
+        if chunk_meta["page_numbers"]:
+            parts.append(f"# Page Numbers: {', '.join(map(str, chunk_meta['page_numbers']))}\n")
+        
+        parts.append("\n---\n\n")
+        
+        # Write the actual chunk text
+        parts.append(text)
+        
+        # Encode once and issue a single write
+        with open(chunk_filename, 'wb') as f:
+            f.write("".join(parts).encode('utf-8'))
+        
+        print(f"Saved chunk {i+1}/{total} to: {chunk_filename}")
+        return chunk_filename
+
+    @staticmethod
+    def _find_duplicate_chunks(chunks: List[Tuple[str, Dict[str, Any]]]) -> List[int]:
+        """
+        Finds chunks with identical text using a content hash.
+        
+        Returns:
+            For each chunk, the index of the first chunk with the same text
+            (its own index when it is the first occurrence)
+        """
+        first_seen: Dict[bytes, int] = {}
+        return [
+            first_seen.setdefault(hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest(), i)
+            for i, (text, _) in enumerate(chunks)
+        ]
+    
+    def _write_chunks_jsonl(self, chunks: List[Tuple[str, Dict[str, Any]]], path_prefix: str) -> str:
+        """
+        Writes all chunks to a single gzip-compressed JSONL file, one object per chunk.
+        
+        Returns:
+            The path of the written JSONL file
+        """
+        chunks_filename = f"{path_prefix}_chunks.jsonl.gz"
+        with gzip.open(chunks_filename, 'wb') as f:
+            for i, (text, meta) in enumerate(chunks):
+                record = {
+                    "index": i + 1,
+                    "headings": meta["headings"],
+                    "page_numbers": meta["page_numbers"],
+                    "text": text,
+                }
+                f.write(_dumps_line(record))
+        
+        print(f"Saved {len(chunks)} chunks to: {chunks_filename}")
+        return chunks_filename
 
     def run(self):
         """
@@ -222,31 +646,32 @@ class ExtractAndChunkWebsite(BaseTool):
         Returns:
             A JSON string containing the operation result with the following structure:
             - On success: {"success": true, "url": "...", "chunks_count": N, "output_dir": "...", "markdown_file": "..."}
+              plus "chunk_files": [...] or, with output_mode="jsonl", "chunks_file": "..."
             - On failure: {"success": false, "error": "error message"}
         """
         temp_file_to_cleanup = None
+        probe_response = None
         
         try:
             # Step 1: Import required libraries
-            from docling.document_converter import DocumentConverter
-            from docling.chunking import HybridChunker
+            DocumentConverter, HybridChunker = _load_docling()
             
         except ImportError as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Failed to import required libraries. Please ensure docling>=2.0.0 is installed. Error: {str(e)}"
-            }, indent=2)
+            })
 
         try:
             # Step 2: Validate URL and check format
-            is_valid, format_type, error_msg = self._check_url_and_format(self.url)
+            is_valid, format_type, probe_response, error_msg = self._check_url_and_format(self.url)
             
             if not is_valid:
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": error_msg,
                     "supported_formats": list(self.SUPPORTED_FORMATS.keys())
-                }, indent=2)
+                })
             
             print(f"[OK] URL is valid. Detected format: {format_type}")
             
@@ -256,13 +681,13 @@ class ExtractAndChunkWebsite(BaseTool):
             
             if format_type == 'TEXT':
                 print("Converting .txt file to .md format...")
-                success, md_file_path, error_msg = self._download_and_convert_txt_to_md(self.url)
+                success, md_file_path, error_msg = self._download_and_convert_txt_to_md(self.url, probe_response)
                 
                 if not success:
-                    return json.dumps({
+                    return _dumps({
                         "success": False,
                         "error": error_msg
-                    }, indent=2)
+                    })
                 
                 source_to_process = md_file_path
                 temp_file_to_cleanup = md_file_path
@@ -278,56 +703,9 @@ class ExtractAndChunkWebsite(BaseTool):
             print(f"[DEBUG] Output directory: {output_dir}")
             print(f"[DEBUG] Current working directory: {os.getcwd()}")
             
-            # Step 5: Initialize DocumentConverter
-            converter = DocumentConverter()
-            
-            # Step 6: Extract content
-            print(f"Extracting content from: {source_to_process}")
-            result = converter.convert(source_to_process)
-            
-            if not result.document:
-                return json.dumps({
-                    "success": False,
-                    "error": "Failed to extract content from the website. No document was returned."
-                }, indent=2)
-            
-            document = result.document
-            
-            # Step 7: Export full markdown and HTML
-            full_markdown = document.export_to_markdown()
-            
-            # Export HTML - try to get it from the result or export from document
-            try:
-                if hasattr(result, 'html') and result.html:
-                    full_html = result.html
-                else:
-                    # Try to export HTML from document
-                    full_html = document.export_to_html()
-            except Exception as e:
-                # If HTML export fails, create a basic HTML wrapper with markdown
-                full_html = f"""<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>{self.url}</title>
-</head>
-<body>
-    <h1>Content from: {self.url}</h1>
-    <p><em>Note: HTML export not available, showing markdown content</em></p>
-    <pre>{full_markdown}</pre>
-</body>
-</html>"""
-            
-            # Step 8: Get model configuration and initialize tokenizer
-            # Import model loader utilities
-            import sys
-            from pathlib import Path
-            # Add document_processor utils path for accessing shared utilities
-            doc_processor_utils_path = Path(__file__).parent.parent.parent / "document_processor" / "tools" / "utils"
-            if str(doc_processor_utils_path) not in sys.path:
-                sys.path.insert(0, str(doc_processor_utils_path))
-            
-            from model_loader import get_tokenizer, get_model_config
+            # Step 5: Get model configuration
+            if _MODEL_LOADER_ERROR is not None:
+                raise _MODEL_LOADER_ERROR
             
             # Get model configuration from environment
             tokenizer_model_env, _, model_source, max_chunk_tokens_env = get_model_config()
@@ -341,77 +719,147 @@ class ExtractAndChunkWebsite(BaseTool):
             print(f"[DEBUG] Resolved values: max_tokens_to_use={max_tokens_to_use}, tokenizer_model_to_use={tokenizer_model_to_use}")
             print(f"[DEBUG] Model source: {model_source}")
             
-            # Load tokenizer based on MODEL_SOURCE
-            tokenizer = get_tokenizer(model_name=tokenizer_model_to_use, model_source=model_source)
-            
-            # Step 9: Initialize HybridChunker with tokenizer instance
-            chunker = HybridChunker(
-                tokenizer=tokenizer,
-                max_tokens=max_tokens_to_use,
-                merge_peers=self.merge_peers,
-            )
+            # Step 6: Look up previously extracted content in the cache. The source is
+            # validated from the probe's headers or the downloaded copy; when the probe was
+            # skipped for a known extension, no extra request is made and the cache is bypassed
+            cache_dir = os.path.join(project_root, ".extract_cache")
+            cache_key = None
+            cached = None
+            if self.use_cache and (probe_response is not None or is_converted_txt):
+                validator = self._get_source_validator(
+                    self.url,
+                    local_path=source_to_process if is_converted_txt else None,
+                    headers=probe_response.headers if probe_response is not None else None,
+                )
+                if validator:
+                    cache_key = self._get_cache_key(
+                        validator, tokenizer_model_to_use, model_source, max_tokens_to_use
+                    )
+                    cached = self._load_cached_extraction(cache_dir, cache_key)
+            
+            # Docling fetches the source itself, so release the probe connection
+            if probe_response is not None:
+                probe_response.close()
+            
+            if cached is not None:
+                print(f"[OK] Using cached extraction: {cache_key}")
+                full_markdown = cached["markdown"]
+                full_html = cached["html"]
+                created = cached["created"]
+                chunks = cached["chunks"]
+            else:
+                # Step 7: Get the shared DocumentConverter
+                converter = _get_converter()
+                
+                # Step 8: Extract content
+                print(f"Extracting content from: {source_to_process}")
+                result = converter.convert(source_to_process)
+                
+                if not result.document:
+                    return _dumps({
+                        "success": False,
+                        "error": "Failed to extract content from the website. No document was returned."
+                    })
+                
+                document = result.document
+                
+                # Step 9: Export full markdown and HTML
+                full_markdown = document.export_to_markdown()
+                # Read the timestamp directly instead of exporting the whole document tree
+                origin = getattr(document, 'origin', None)
+                created = getattr(origin, 'created', None) or getattr(document, 'created', None) or 'N/A'
+                
+                # Export HTML - try to get it from the result or export from document
+                try:
+                    if hasattr(result, 'html') and result.html:
+                        full_html = result.html
+                    else:
+                        # Try to export HTML from document
+                        full_html = document.export_to_html()
+                except Exception as e:
+                    # If HTML export fails, render the already exported markdown instead
+                    full_html = _render_markdown_html(self.url, full_markdown)
+                
+                # Step 10: Load tokenizer based on MODEL_SOURCE
+                tokenizer = _get_cached_tokenizer(tokenizer_model_to_use, model_source)
+                
+                # Step 11: Chunk the document
+                print(f"Chunking document with tokenizer={tokenizer_model_to_use} (source: {model_source}), max_tokens={max_tokens_to_use}")
+                if self.fast_chunking and getattr(tokenizer, 'is_fast', False):
+                    # Single tokenization pass over the full markdown
+                    chunk_iter = _fast_chunk_markdown(full_markdown, tokenizer, max_tokens_to_use)
+                else:
+                    # Initialize HybridChunker with tokenizer instance
+                    chunker = HybridChunker(
+                        tokenizer=tokenizer,
+                        max_tokens=max_tokens_to_use,
+                        merge_peers=self.merge_peers,
+                    )
+                    chunk_iter = chunker.chunk(dl_doc=document)
+                
+                # Reduce each chunk to its text and metadata as it is produced, so
+                # the full chunk objects are never all held in memory at once
+                chunks = [(chunk.text, self._extract_chunk_meta(chunk)) for chunk in chunk_iter]
+                
+                if cache_key:
+                    self._store_cached_extraction(cache_dir, cache_key, {
+                        "markdown": full_markdown,
+                        "html": full_html,
+                        "created": created,
+                        "chunks": chunks,
+                    })
             
-            # Step 10: Chunk the document
-            print(f"Chunking document with tokenizer={tokenizer_model_to_use} (source: {model_source}), max_tokens={max_tokens_to_use}")
-            chunk_iter = chunker.chunk(dl_doc=document)
-            chunks = list(chunk_iter)
             print(f"[DEBUG] Created {len(chunks)} chunks")
             
-            # Step 10: Save individual chunks to separate files
+            # Step 12: Save chunks to separate files or a single JSONL file
             sanitized_url = self._sanitize_filename(self.url)
+            # Every output file shares this prefix
+            path_prefix = os.path.join(output_dir, sanitized_url)
+            total_chunks = len(chunks)
             chunk_files = []
-            
-            for i, chunk in enumerate(chunks):
-                chunk_filename = os.path.join(output_dir, f"{sanitized_url}_chunk_{i+1}.txt")
-                print(f"Saved chunk {i+1}/{len(chunks)} to: {chunk_filename}")
-                with open(chunk_filename, 'w', encoding='utf-8') as f:
-                    # Write chunk metadata
-                    f.write(f"# Chunk {i+1} of {len(chunks)}\n")
-                    f.write(f"# Source URL: {self.url}\n")
-                    f.write(f"# Chunk Index: {i+1}\n")
-                    
-                    # Write chunk headings if available
-                    if hasattr(chunk.meta, 'headings') and chunk.meta.headings:
-                        f.write(f"# Headings: {' > '.join(chunk.meta.headings)}\n")
-                    
-                    # Write page numbers if available
-                    if hasattr(chunk.meta, 'doc_items') and chunk.meta.doc_items:
-                        page_numbers = sorted(set(
-                            prov.page_no
-                            for item in chunk.meta.doc_items
-                            for prov in item.prov
-                            if hasattr(prov, 'page_no')
-                        ))
-                        if page_numbers:
-                            f.write(f"# Page Numbers: {', '.join(map(str, page_numbers))}\n")
-                    
-                    f.write("\n---\n\n")
-                    
-                    # Write the actual chunk text
-                    f.write(chunk.text)
+            chunks_file = None
+            # Index of the first chunk with identical text, for each chunk
+            dedup_refs = list(range(total_chunks))
+            
+            if self.output_mode == "jsonl":
+                chunks_file = self._write_chunks_jsonl(chunks, path_prefix)
+            else:
+                if self.deduplicate_chunks:
+                    dedup_refs = self._find_duplicate_chunks(chunks)
+                unique_indices = [i for i in range(total_chunks) if dedup_refs[i] == i]
                 
-                chunk_files.append(chunk_filename)
-                print(f"Saved chunk {i+1}/{len(chunks)} to: {chunk_filename}")
-            
-            # Step 11: Save full markdown document
-            markdown_filename = os.path.join(output_dir, f"{sanitized_url}.md")
-            with open(markdown_filename, 'w', encoding='utf-8') as f:
-                f.write(f"# Website Content: {self.url}\n\n")
-                f.write(f"Extracted on: {result.document.export_to_dict().get('created', 'N/A')}\n\n")
-                f.write("---\n\n")
-                f.write(full_markdown)
+                # Chunk files are independent, so write them concurrently
+                with ThreadPoolExecutor(max_workers=max(1, min(16, len(unique_indices)))) as executor:
+                    written = dict(zip(unique_indices, executor.map(
+                        lambda i: self._write_chunk(i, *chunks[i], path_prefix, total_chunks),
+                        unique_indices
+                    )))
+                
+                # Duplicate chunks point at the file of their first occurrence
+                chunk_files = [written[dedup_refs[i]] for i in range(total_chunks)]
+                skipped = total_chunks - len(unique_indices)
+                if skipped:
+                    print(f"Skipped writing {skipped} duplicate chunk(s)")
+            
+            # Step 13: Save full markdown document
+            markdown_filename = f"{path_prefix}.md"
+            markdown_header = f"# Website Content: {self.url}\n\nExtracted on: {created}\n\n---\n\n"
+            with open(markdown_filename, 'wb') as f:
+                # Encode the (potentially multi-MB) markdown exactly once
+                f.write(markdown_header.encode('utf-8'))
+                f.write(full_markdown.encode('utf-8'))
             
             print(f"Saved full markdown to: {markdown_filename}")
             
-            # Step 12: Save full HTML document
-            html_filename = os.path.join(output_dir, f"{sanitized_url}.html")
-            with open(html_filename, 'w', encoding='utf-8') as f:
-                f.write(full_html)
+            # Step 14: Save full HTML document
+            html_filename = f"{path_prefix}.html"
+            with open(html_filename, 'wb') as f:
+                f.write(full_html.encode('utf-8'))
             
             print(f"Saved full HTML to: {html_filename}")
             
-            # Step 13: Create a summary file with chunk information
-            summary_filename = os.path.join(output_dir, f"{sanitized_url}_summary.json")
+            # Step 15: Create a summary file with chunk information
+            summary_filename = f"{path_prefix}_summary.json"
             summary = {
                 "url": self.url,
                 "detected_format": format_type,
@@ -422,30 +870,23 @@ class ExtractAndChunkWebsite(BaseTool):
                 "model_source": model_source,
                 "merge_peers": self.merge_peers,
                 "chunk_files": chunk_files,
+                "chunks_file": chunks_file,
                 "markdown_file": markdown_filename,
                 "html_file": html_filename,
                 "chunks_metadata": [
-                    {
-                        "chunk_index": i + 1,
-                        "text_length": len(chunk.text),
-                        "headings": chunk.meta.headings if hasattr(chunk.meta, 'headings') else [],
-                        "page_numbers": sorted(set(
-                            prov.page_no
-                            for item in chunk.meta.doc_items
-                            for prov in item.prov
-                            if hasattr(prov, 'page_no')
-                        )) if hasattr(chunk.meta, 'doc_items') else []
-                    }
-                    for i, chunk in enumerate(chunks)
+                    {"chunk_index": i + 1, **meta}
+                    if dedup_refs[i] == i else
+                    {"chunk_index": i + 1, **meta, "dedup_ref_index": dedup_refs[i] + 1}
+                    for i, (_, meta) in enumerate(chunks)
                 ]
             }
             
-            with open(summary_filename, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, indent=2)
+            with open(summary_filename, 'wb') as f:
+                f.write(_dumps_bytes(summary))
             
             print(f"Saved summary to: {summary_filename}")
             
-            # Step 14: Clean up temporary file if created
+            # Step 16: Clean up temporary file if created
             if temp_file_to_cleanup and os.path.exists(temp_file_to_cleanup):
                 try:
                     os.unlink(temp_file_to_cleanup)
@@ -453,8 +894,8 @@ class ExtractAndChunkWebsite(BaseTool):
                 except Exception as cleanup_error:
                     print(f"Warning: Failed to cleanup temp file: {cleanup_error}")
             
-            # Step 15: Return success result
-            return json.dumps({
+            # Step 17: Return success result
+            result_payload = {
                 "success": True,
                 "url": self.url,
                 "detected_format": format_type,
@@ -467,8 +908,12 @@ class ExtractAndChunkWebsite(BaseTool):
                 "markdown_file": markdown_filename,
                 "html_file": html_filename,
                 "summary_file": summary_filename,
-                "chunk_files": chunk_files
-            }, indent=2)
+            }
+            if chunks_file:
+                result_payload["chunks_file"] = chunks_file
+            else:
+                result_payload["chunk_files"] = chunk_files
+            return _dumps(result_payload)
             
         except Exception as e:
             # Handle any errors during processing
@@ -482,11 +927,15 @@ class ExtractAndChunkWebsite(BaseTool):
                 except:
                     pass
             
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Failed to extract and chunk website. Error: {str(e)}",
                 "traceback": error_trace
-            }, indent=2)
+            })
+        
+        finally:
+            if probe_response is not None:
+                probe_response.close()
 
 
 if __name__ == "__main__":
@@ -3,25 +3,62 @@ Process multiple documents with advanced batch management.
 """
 
 from agency_swarm.tools import BaseTool
-from pydantic import Field
-from typing import List, Dict, Any
-import json
+from pydantic import ConfigDict, Field
+from typing import List, Dict, Any, Optional
 import asyncio
-from datetime import datetime
+import io
+import os
+import time
+from dataclasses import dataclass
 
-# Import our shared utilities
+# Import our shared utilities; the tools folder is added to the import path once
 import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent))
-from utils.docling_processor import DoclingProcessor
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps as _dumps, without_none
+from utils.docling_processor import looks_like_base64
+from utils.processor_pool import processor_pool
+from utils.event_loop import run_coroutine
 from utils.concurrency.batch_processor import BatchProcessor
 
+# Fields of a DoclingProcessor result that the batch output reports
+_SUMMARY_KEYS = ("success", "error", "content_length", "input_type")
+
+def _classify(input_source: str) -> str:
+    """Classify a source as url, file or base64 with at most one stat"""
+    if input_source.startswith(("http://", "https://")):
+        return "url"
+    if looks_like_base64(input_source):
+        return "base64"
+    try:
+        os.stat(input_source)
+        return "file"
+    except (OSError, ValueError):
+        return "base64"
+
+@dataclass(slots=True)
+class DocResult:
+    """Per-document entry in the batch results; None fields are left out of the output"""
+    source: str
+    success: bool
+    processing_time: float
+    content_length: Optional[int] = None
+    error: Optional[str] = None
+    input_type: Optional[str] = None
+    retry_failed: Optional[bool] = None
+
+
 class BatchProcessDocuments(BaseTool):
     """
     Process multiple documents with advanced batch management, including retry logic, 
     progress tracking, and comprehensive error handling.
     """
     
+    # Tool arguments are read-only once the tool is constructed
+    model_config = ConfigDict(frozen=True, validate_assignment=False)
+    
     input_sources: List[str] = Field(
         ..., 
         description="List of file paths, URLs, or base64 content to process"
@@ -34,7 +71,7 @@ class BatchProcessDocuments(BaseTool):
     
     batch_size: int = Field(
         default=10,
-        description="Number of documents per batch (1-100)"
+        description="Number of completed documents between progress reports (1-100)"
     )
     
     retry_failed: bool = Field(
@@ -49,7 +86,9 @@ class BatchProcessDocuments(BaseTool):
     
     progress_callback: str = Field(
         default="console",
-        description="Progress tracking method (console, silent, detailed)"
+        description="Progress tracking method (console, silent, detailed, realtime). "
+                    "console and detailed are written once when the run finishes; "
+                    "realtime prints detailed progress as it happens"
     )
     
     annotate_images: bool = Field(
@@ -74,151 +113,109 @@ class BatchProcessDocuments(BaseTool):
         try:
             # Step 1: Validate inputs
             if not self.input_sources:
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "input_sources list must not be empty"
-                }, indent=2)
+                })
             
             if not (1 <= self.max_workers <= 20):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "max_workers must be between 1 and 20"
-                }, indent=2)
+                })
             
             if not (1 <= self.batch_size <= 100):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "batch_size must be between 1 and 100"
-                }, indent=2)
+                })
             
             # Step 2: Run async processing
-            result = asyncio.run(self._process_batch_async())
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            self._log_buf = io.StringIO()
+            try:
+                return run_coroutine(self._run_async())
+            finally:
+                self._flush_log()
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
+    
+    async def _run_async(self) -> str:
+        """Process the batch, then serialize the result off the event loop thread"""
+        result = await self._process_batch_async()
+        return await asyncio.to_thread(_dumps, result)
     
     async def _process_batch_async(self) -> Dict[str, Any]:
         """Asynchronous batch processing implementation"""
         
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         total_documents = len(self.input_sources)
         
-        # Step 1: Create processor and batch processor
-        processor = DoclingProcessor(
-            annotate_images=self.annotate_images,
-            images_scale=self.images_scale,
-            save_images_as_files=self.save_images_as_files,
-            max_workers=self.max_workers
+        # Step 1: Create batch processor; documents are converted with pooled processors
+        max_retries = self.max_retries if self.retry_failed else 0
+        batch_processor = BatchProcessor(
+            max_concurrent=self.max_workers,
+            max_retries=max_retries,
+            retry_callback=lambda source, attempt, error: self._log(
+                f"  Retry {attempt}/{max_retries} for {source}: {str(error)}", detailed=True
+            )
         )
         
-        batch_processor = BatchProcessor(max_concurrent=self.max_workers)
+        # Classify each distinct source once per run, so paths created or deleted
+        # between runs are seen; the stat calls run concurrently in worker threads
+        local_sources = [
+            source for source in dict.fromkeys(self.input_sources)
+            if not source.startswith(("http://", "https://"))
+        ]
+        local_types = await asyncio.gather(
+            *(asyncio.to_thread(_classify, source) for source in local_sources)
+        )
+        self._input_types = dict.fromkeys(self.input_sources, "url")
+        self._input_types.update(zip(local_sources, local_types))
         
-        # Step 2: Process documents in batches
-        all_results = []
+        # Step 2: Process every document in one call; the BatchProcessor semaphore keeps
+        # max_workers documents in flight and results are formatted as they complete
+        formatted_results = []
         failed_documents = []
+        successful_count = 0
+        report_every = self.batch_size
         
-        for i in range(0, total_documents, self.batch_size):
-            batch_sources = self.input_sources[i:i + self.batch_size]
-            batch_num = (i // self.batch_size) + 1
-            total_batches = (total_documents + self.batch_size - 1) // self.batch_size
-            
-            if self.progress_callback in ["console", "detailed"]:
-                print(f"Processing batch {batch_num}/{total_batches} ({len(batch_sources)} documents)")
-            
-            # Process batch
-            batch_result = await batch_processor.process_documents(
-                documents=batch_sources,
-                processor_func=self._process_single_document,
-                batch_id=f"batch_{batch_num}"
-            )
-            
-            # Collect results
-            for result in batch_result.results:
-                if result.success:
-                    all_results.append(result)
-                else:
-                    failed_documents.append(result)
+        def on_complete(completed: int, total: int, result) -> None:
+            nonlocal successful_count
+            if result.success:
+                formatted_results.append(self._format_result(result))
+                successful_count += 1
+            else:
+                failed_documents.append(result)
+                self._log(f"  Failed: {result.source}: {result.error}", detailed=True)
             
-            if self.progress_callback == "detailed":
-                print(f"  Batch {batch_num} completed: {batch_result.successful_documents}/{batch_result.total_documents} successful")
+            if completed % report_every == 0 or completed == total:
+                self._log(f"Processed {completed}/{total} documents ({successful_count} successful)")
         
-        # Step 3: Retry failed documents if enabled
-        if self.retry_failed and failed_documents:
-            if self.progress_callback in ["console", "detailed"]:
-                print(f"Retrying {len(failed_documents)} failed documents...")
-            
-            for retry_attempt in range(self.max_retries):
-                if not failed_documents:
-                    break
-                
-                retry_sources = [doc.source for doc in failed_documents]
-                retry_result = await batch_processor.process_documents(
-                    documents=retry_sources,
-                    processor_func=self._process_single_document,
-                    batch_id=f"retry_{retry_attempt + 1}"
-                )
-                
-                # Update results
-                new_failed = []
-                for result in retry_result.results:
-                    if result.success:
-                        all_results.append(result)
-                    else:
-                        new_failed.append(result)
-                
-                failed_documents = new_failed
-                
-                if self.progress_callback == "detailed":
-                    print(f"  Retry {retry_attempt + 1}: {retry_result.successful_documents}/{retry_result.total_documents} successful")
+        await batch_processor.process_documents(
+            documents=self.input_sources,
+            processor_func=self._process_single_document,
+            batch_id="main",
+            progress_callback=on_complete
+        )
         
-        # Step 4: Prepare final results
-        end_time = datetime.now()
-        total_processing_time = (end_time - start_time).total_seconds()
+        # Step 3: Prepare final results
+        total_processing_time = (time.perf_counter_ns() - start_ns) / 1e9
         
-        successful_count = len(all_results)
         failed_count = len(failed_documents)
         
-        # Step 5: Format results
-        formatted_results = []
-        for result in all_results:
-            if result.success:
-                doc_result = result.result
-                if doc_result.get("success"):
-                    formatted_results.append({
-                        "source": result.source,
-                        "success": True,
-                        "content_length": doc_result.get("content_length"),
-                        "processing_time": result.processing_time,
-                        "input_type": doc_result.get("input_type", "unknown")
-                    })
-                else:
-                    formatted_results.append({
-                        "source": result.source,
-                        "success": False,
-                        "error": doc_result.get("error"),
-                        "processing_time": result.processing_time
-                    })
-            else:
-                formatted_results.append({
-                    "source": result.source,
-                    "success": False,
-                    "error": result.error,
-                    "processing_time": result.processing_time
-                })
-        
-        # Add failed documents to results
+        # Step 4: Add documents that still failed after retries
         for result in failed_documents:
-            formatted_results.append({
-                "source": result.source,
-                "success": False,
-                "error": result.error,
-                "processing_time": result.processing_time,
-                "retry_failed": True
-            })
+            formatted_results.append(DocResult(
+                source=result.source,
+                success=False,
+                processing_time=result.processing_time,
+                error=result.error,
+                retry_failed=True
+            ))
         
         return {
             "success": True,
@@ -232,30 +229,62 @@ class BatchProcessDocuments(BaseTool):
             "max_retries": self.max_retries,
             "annotate_images": self.annotate_images,
             "save_images_as_files": self.save_images_as_files,
-            "results": formatted_results,
+            "results": [without_none(doc_result) for doc_result in formatted_results],
             "message": f"Batch processing completed: {successful_count}/{total_documents} documents successful"
         }
     
-    async def _process_single_document(self, input_source: str) -> Dict[str, Any]:
-        """Process a single document"""
-        processor = DoclingProcessor(
-            annotate_images=self.annotate_images,
-            images_scale=self.images_scale,
-            save_images_as_files=self.save_images_as_files
+    def _log(self, message: str, detailed: bool = False):
+        """Record a progress message according to progress_callback"""
+        mode = self.progress_callback
+        if mode == "realtime":
+            print(message)
+        elif mode == "detailed" or (mode == "console" and not detailed):
+            self._log_buf.write(message + "\n")
+    
+    def _flush_log(self):
+        """Write buffered progress messages to stdout in one call"""
+        output = self._log_buf.getvalue()
+        if output:
+            sys.stdout.write(output)
+            sys.stdout.flush()
+        self._log_buf = io.StringIO()
+    
+    @staticmethod
+    def _format_result(result) -> DocResult:
+        """Format a completed ProcessingResult for the tool output"""
+        doc_result = result.result
+        
+        if doc_result.get("success"):
+            return DocResult(
+                source=result.source,
+                success=True,
+                processing_time=result.processing_time,
+                content_length=doc_result.get("content_length"),
+                input_type=doc_result.get("input_type", "unknown")
+            )
+        return DocResult(
+            source=result.source,
+            success=False,
+            processing_time=result.processing_time,
+            error=doc_result.get("error")
         )
+    
+    async def _process_single_document(self, input_source: str) -> Dict[str, Any]:
+        """Process a single document with a pooled processor"""
+        input_type = self._input_types.get(input_source)
+        if input_type is None:
+            input_type = _classify(input_source)
         
-        # Auto-detect input type
-        if input_source.startswith(("http://", "https://")):
-            input_type = "url"
-        elif os.path.exists(input_source):
-            input_type = "file"
-        else:
-            input_type = "base64"
+        key = (self.annotate_images, self.images_scale, self.save_images_as_files)
+        async with processor_pool.lease(key) as processor:
+            result = await processor.convert_document(
+                input_source=input_source,
+                input_type=input_type
+            )
         
-        return await processor.convert_document(
-            input_source=input_source,
-            input_type=input_type
-        )
+        # Keep only what _format_result reports so converted documents are not
+        # held until the whole batch finishes
+        return {key: result[key] for key in _SUMMARY_KEYS if key in result}
 
 
 if __name__ == "__main__":
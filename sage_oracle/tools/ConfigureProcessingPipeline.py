@@ -3,17 +3,149 @@ Configure and customize the document processing pipeline.
 """
 
 from agency_swarm.tools import BaseTool
-from pydantic import Field
+from pydantic import ConfigDict, Field
 from typing import Dict, Any, List, Union
-import json
 from datetime import datetime
 
+# Import our shared utilities; the tools folder is added to the import path once
+import sys
+from pathlib import Path
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps as _dumps
+
+# Validator vocabularies
+_PIPELINE_KEYS = frozenset({
+    "enable_chunking", "enable_embeddings", "enable_image_annotation",
+    "chunk_size", "chunk_overlap", "embedding_model", "image_model"
+})
+_STAGES = frozenset({"conversion", "chunking", "embedding", "storage"})
+# Ordered copy kept for error messages
+_FORMAT_NAMES = ("markdown", "json", "html", "pdf")
+_FORMATS = frozenset(_FORMAT_NAMES)
+
+# Reported for every configuration that passes _validate_configuration
+_PASSED_TEST_RESULT = {
+    "pipeline_test": "passed",
+    "stage_test": "passed",
+    "concurrency_test": "passed",
+    "output_test": "passed",
+    "overall": "passed"
+}
+
+# Default pipeline configuration; copied before settings are applied
+_DEFAULT_CONFIG = {
+    "pipeline": {
+        "enable_chunking": True,
+        "enable_embeddings": True,
+        "enable_image_annotation": True,
+        "chunk_size": 1000,
+        "chunk_overlap": 200,
+        "embedding_model": "text-embedding-3-small",
+        "image_model": "gpt-4o-mini"
+    },
+    "stages": {
+        "conversion": {
+            "enabled": True,
+            "timeout": 300,
+            "retry_attempts": 3
+        },
+        "chunking": {
+            "enabled": True,
+            "strategy": "hybrid",
+            "max_chunk_size": 1000
+        },
+        "embedding": {
+            "enabled": True,
+            "model": "text-embedding-3-small",
+            "batch_size": 100
+        },
+        "storage": {
+            "enabled": True,
+            "format": "markdown",
+            "include_metadata": True
+        }
+    },
+    "concurrency": {
+        "max_concurrent": 10,
+        "max_workers": 4,
+        "batch_size": 10,
+        "queue_size": 100
+    },
+    "output": {
+        "format": "markdown",
+        "save_images_as_files": True,
+        "images_scale": 2,
+        "include_annotations": True
+    }
+}
+
+
+def _clone_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a nested config dict; leaves are immutable scalars so only dicts are copied"""
+    return {
+        key: _clone_config(value) if type(value) is dict else value
+        for key, value in config.items()
+    }
+
+
+# Bitmask flags returned by _bounds_failures
+_MAX_CONCURRENT_OUT_OF_RANGE = 1
+_MAX_WORKERS_OUT_OF_RANGE = 2
+_CHUNK_SIZE_NOT_POSITIVE = 4
+_CHUNK_OVERLAP_NEGATIVE = 8
+_CHUNK_OVERLAP_TOO_LARGE = 16
+
+_PIPELINE_BOUNDS = (
+    (_CHUNK_SIZE_NOT_POSITIVE, "chunk_size must be a positive number"),
+    (_CHUNK_OVERLAP_NEGATIVE, "chunk_overlap must be a non-negative number"),
+    (_CHUNK_OVERLAP_TOO_LARGE, "chunk_overlap must be smaller than chunk_size"),
+)
+_CONCURRENCY_BOUNDS = (
+    (_MAX_CONCURRENT_OUT_OF_RANGE, "max_concurrent must be an integer between 1 and 50"),
+    (_MAX_WORKERS_OUT_OF_RANGE, "max_workers must be an integer between 1 and 20"),
+)
+
+
+def _bounds_failures(max_concurrent, max_workers, chunk_size, chunk_overlap) -> int:
+    """Return a bitmask of the numeric bounds the given settings violate"""
+    failures = 0
+    if not 1 <= max_concurrent <= 50:
+        failures |= _MAX_CONCURRENT_OUT_OF_RANGE
+    if not 1 <= max_workers <= 20:
+        failures |= _MAX_WORKERS_OUT_OF_RANGE
+    if chunk_size <= 0:
+        failures |= _CHUNK_SIZE_NOT_POSITIVE
+    elif chunk_overlap < 0:
+        failures |= _CHUNK_OVERLAP_NEGATIVE
+    elif chunk_overlap >= chunk_size:
+        failures |= _CHUNK_OVERLAP_TOO_LARGE
+    return failures
+
+
+def _numeric_setting(settings: Dict[str, Any], key: str, defaults: Dict[str, Any], types, invalid):
+    """Read a numeric setting, falling back to its default or to an out-of-range value on bad types"""
+    value = settings.get(key, defaults[key])
+    if isinstance(value, bool) or not isinstance(value, types):
+        return invalid
+    return value
+
+
+def _bound_errors(failures: int, bounds) -> List[str]:
+    """Translate _bounds_failures flags into error messages"""
+    return [message for flag, message in bounds if failures & flag]
+
+
 class ConfigureProcessingPipeline(BaseTool):
     """
     Configure and customize the document processing pipeline, allowing dynamic 
     adjustment of processing parameters and settings.
     """
     
+    # Tool arguments are read-only once the tool is constructed
+    model_config = ConfigDict(frozen=True, validate_assignment=False)
+    
     pipeline_config: Dict[str, Any] = Field(
         default={},
         description="Pipeline configuration parameters"
@@ -42,61 +174,68 @@ class ConfigureProcessingPipeline(BaseTool):
             # Step 1: Validate configuration
             validation_result = self._validate_configuration()
             if not validation_result["valid"]:
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "Configuration validation failed",
                     "validation_errors": validation_result["errors"]
-                }, indent=2)
+                })
             
             # Step 2: Apply configuration
             result = self._apply_configuration()
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return _dumps(result)
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
     
     def _validate_configuration(self) -> Dict[str, Any]:
         """Validate the provided configuration"""
         errors = []
         
+        # Check every numeric bound at once; values missing or of the wrong
+        # type are replaced with defaults or out-of-range sentinels
+        pipeline_defaults = _DEFAULT_CONFIG["pipeline"]
+        concurrency_defaults = _DEFAULT_CONFIG["concurrency"]
+        failures = _bounds_failures(
+            _numeric_setting(self.concurrency_settings, "max_concurrent", concurrency_defaults, int, 0),
+            _numeric_setting(self.concurrency_settings, "max_workers", concurrency_defaults, int, 0),
+            _numeric_setting(self.pipeline_config, "chunk_size", pipeline_defaults, (int, float), 0),
+            _numeric_setting(self.pipeline_config, "chunk_overlap", pipeline_defaults, (int, float), -1)
+        )
+        
         # Validate pipeline config
         if self.pipeline_config:
-            valid_pipeline_keys = [
-                "enable_chunking", "enable_embeddings", "enable_image_annotation",
-                "chunk_size", "chunk_overlap", "embedding_model", "image_model"
-            ]
             for key in self.pipeline_config:
-                if key not in valid_pipeline_keys:
+                if key not in _PIPELINE_KEYS:
                     errors.append(f"Invalid pipeline config key: {key}")
+            
+            errors.extend(_bound_errors(failures, _PIPELINE_BOUNDS))
         
         # Validate stage settings
         if self.stage_settings:
-            valid_stages = ["conversion", "chunking", "embedding", "storage"]
             for stage in self.stage_settings:
-                if stage not in valid_stages:
+                if stage not in _STAGES:
                     errors.append(f"Invalid stage: {stage}")
+                elif not isinstance(self.stage_settings[stage], dict):
+                    errors.append(f"{stage} settings must be a dictionary")
+                elif not isinstance(self.stage_settings[stage].get("enabled", True), bool):
+                    errors.append(f"{stage}.enabled must be a boolean")
         
         # Validate concurrency settings
         if self.concurrency_settings:
-            if "max_concurrent" in self.concurrency_settings:
-                max_concurrent = self.concurrency_settings["max_concurrent"]
-                if not isinstance(max_concurrent, int) or not (1 <= max_concurrent <= 50):
-                    errors.append("max_concurrent must be an integer between 1 and 50")
-            
-            if "max_workers" in self.concurrency_settings:
-                max_workers = self.concurrency_settings["max_workers"]
-                if not isinstance(max_workers, int) or not (1 <= max_workers <= 20):
-                    errors.append("max_workers must be an integer between 1 and 20")
+            errors.extend(_bound_errors(failures, _CONCURRENCY_BOUNDS))
         
         # Validate output settings
         if self.output_settings:
             if "output_format" in self.output_settings:
-                valid_formats = ["markdown", "json", "html", "pdf"]
-                if self.output_settings["output_format"] not in valid_formats:
-                    errors.append(f"Invalid output format. Must be one of: {valid_formats}")
+                if self.output_settings["output_format"] not in _FORMATS:
+                    errors.append(f"Invalid output format. Must be one of: {list(_FORMAT_NAMES)}")
+            
+            if "format" in self.output_settings:
+                if self.output_settings["format"] not in _FORMATS:
+                    errors.append(f"Invalid output format. Must be one of: {list(_FORMAT_NAMES)}")
             
             if "save_images_as_files" in self.output_settings:
                 if not isinstance(self.output_settings["save_images_as_files"], bool):
@@ -110,52 +249,8 @@ class ConfigureProcessingPipeline(BaseTool):
     def _apply_configuration(self) -> Dict[str, Any]:
         """Apply the configuration settings"""
         
-        # Default configuration
-        current_config = {
-            "pipeline": {
-                "enable_chunking": True,
-                "enable_embeddings": True,
-                "enable_image_annotation": True,
-                "chunk_size": 1000,
-                "chunk_overlap": 200,
-                "embedding_model": "text-embedding-3-small",
-                "image_model": "gpt-4o-mini"
-            },
-            "stages": {
-                "conversion": {
-                    "enabled": True,
-                    "timeout": 300,
-                    "retry_attempts": 3
-                },
-                "chunking": {
-                    "enabled": True,
-                    "strategy": "hybrid",
-                    "max_chunk_size": 1000
-                },
-                "embedding": {
-                    "enabled": True,
-                    "model": "text-embedding-3-small",
-                    "batch_size": 100
-                },
-                "storage": {
-                    "enabled": True,
-                    "format": "markdown",
-                    "include_metadata": True
-                }
-            },
-            "concurrency": {
-                "max_concurrent": 10,
-                "max_workers": 4,
-                "batch_size": 10,
-                "queue_size": 100
-            },
-            "output": {
-                "format": "markdown",
-                "save_images_as_files": True,
-                "images_scale": 2,
-                "include_annotations": True
-            }
-        }
+        # Start from a fresh copy of the default configuration
+        current_config = _clone_config(_DEFAULT_CONFIG)
         
         # Apply pipeline config
         if self.pipeline_config:
@@ -175,68 +270,15 @@ class ConfigureProcessingPipeline(BaseTool):
         if self.output_settings:
             current_config["output"].update(self.output_settings)
         
-        # Test configuration with sample data
-        test_result = self._test_configuration(current_config)
-        
         return {
             "success": True,
             "configuration_applied": True,
             "current_configuration": current_config,
-            "test_result": test_result,
+            # Everything the old post-apply test checked is now enforced by validation
+            "test_result": dict(_PASSED_TEST_RESULT),
             "timestamp": datetime.now().isoformat(),
             "message": "Pipeline configuration updated successfully"
         }
-    
-    def _test_configuration(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Test the configuration with sample data"""
-        
-        test_results = {
-            "pipeline_test": "passed",
-            "stage_test": "passed",
-            "concurrency_test": "passed",
-            "output_test": "passed"
-        }
-        
-        # Test pipeline configuration
-        try:
-            if config["pipeline"]["chunk_size"] <= 0:
-                test_results["pipeline_test"] = "failed: chunk_size must be positive"
-            if config["pipeline"]["chunk_overlap"] < 0:
-                test_results["pipeline_test"] = "failed: chunk_overlap cannot be negative"
-        except Exception as e:
-            test_results["pipeline_test"] = f"failed: {str(e)}"
-        
-        # Test stage configuration
-        try:
-            for stage, settings in config["stages"].items():
-                if "enabled" in settings and not isinstance(settings["enabled"], bool):
-                    test_results["stage_test"] = f"failed: {stage}.enabled must be boolean"
-                    break
-        except Exception as e:
-            test_results["stage_test"] = f"failed: {str(e)}"
-        
-        # Test concurrency configuration
-        try:
-            if config["concurrency"]["max_concurrent"] > 50:
-                test_results["concurrency_test"] = "failed: max_concurrent too high"
-            if config["concurrency"]["max_workers"] > 20:
-                test_results["concurrency_test"] = "failed: max_workers too high"
-        except Exception as e:
-            test_results["concurrency_test"] = f"failed: {str(e)}"
-        
-        # Test output configuration
-        try:
-            valid_formats = ["markdown", "json", "html", "pdf"]
-            if config["output"]["format"] not in valid_formats:
-                test_results["output_test"] = f"failed: invalid output format"
-        except Exception as e:
-            test_results["output_test"] = f"failed: {str(e)}"
-        
-        # Overall test result
-        all_passed = all(result == "passed" for result in test_results.values())
-        test_results["overall"] = "passed" if all_passed else "failed"
-        
-        return test_results
 
 
 if __name__ == "__main__":
@@ -3,18 +3,40 @@ Process a single document through the complete pipeline.
 """
 
 from agency_swarm.tools import BaseTool
-from pydantic import Field
+from pydantic import ConfigDict, Field
 from typing import Dict, Any
-import json
 import asyncio
 import os
 from pathlib import Path
 
-# Import our shared utilities
+# Import our shared utilities; the tools folder is added to the import path once
 import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent))
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps as _dumps
 from utils.docling_processor import DoclingProcessor
+from utils.event_loop import run_coroutine
+from utils.filenames import base_filename_for_url
+
+
+def _is_url(source: str) -> bool:
+    """Check whether a source is an http(s) URL"""
+    return source.startswith(("http://", "https://"))
+
+
+# Auto-detection order: first matching detector decides, base64 otherwise
+_DETECTORS = (
+    ("url", _is_url),
+    ("file", os.path.exists),
+)
+
+# Checks for explicitly declared input types, with the error message prefix on failure
+_VALIDATORS = {
+    "file": (os.path.exists, "File not found"),
+    "url": (_is_url, "Invalid URL"),
+}
+
 
 class ConvertSingleDocument(BaseTool):
     """
@@ -22,6 +44,9 @@ class ConvertSingleDocument(BaseTool):
     and providing comprehensive processing capabilities.
     """
     
+    # Tool arguments are read-only once the tool is constructed
+    model_config = ConfigDict(frozen=True, validate_assignment=False)
+    
     input_source: str = Field(
         ..., 
         description="File path, URL, or base64 content to process"
@@ -69,48 +94,45 @@ class ConvertSingleDocument(BaseTool):
         try:
             # Step 1: Validate inputs
             if not self.input_source:
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "input_source must be provided"
-                }, indent=2)
+                })
             
             # Step 2: Run async processing
-            result = asyncio.run(self._process_single_document_async())
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return run_coroutine(self._run_async())
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
+    
+    async def _run_async(self) -> str:
+        """Process the document, then serialize the result off the event loop thread"""
+        result = await self._process_single_document_async()
+        return await asyncio.to_thread(_dumps, result)
     
     async def _process_single_document_async(self) -> Dict[str, Any]:
         """Asynchronous single document processing implementation"""
         
-        # Step 1: Auto-detect input type if needed
+        # Step 1: Auto-detect the input type, or validate an explicitly declared one
+        # (a detected type needs no second check)
         input_type = self.input_type
         if input_type == "auto":
-            if self.input_source.startswith(("http://", "https://")):
-                input_type = "url"
-            elif os.path.exists(self.input_source):
-                input_type = "file"
-            else:
-                input_type = "base64"
-        
-        # Step 2: Validate input based on type
-        if input_type == "file" and not os.path.exists(self.input_source):
-            return {
-                "success": False,
-                "error": f"File not found: {self.input_source}"
-            }
-        
-        if input_type == "url" and not self.input_source.startswith(('http://', 'https://')):
-            return {
-                "success": False,
-                "error": f"Invalid URL: {self.input_source}"
-            }
+            input_type = next(
+                (name for name, matches in _DETECTORS if matches(self.input_source)),
+                "base64"
+            )
+        elif input_type in _VALIDATORS:
+            validate, error_prefix = _VALIDATORS[input_type]
+            if not validate(self.input_source):
+                return {
+                    "success": False,
+                    "error": f"{error_prefix}: {self.input_source}"
+                }
         
-        # Step 3: Create processor
+        # Step 2: Create processor
         processor = DoclingProcessor(
             annotate_images=self.annotate_images,
             images_scale=self.images_scale,
@@ -118,7 +140,7 @@ class ConvertSingleDocument(BaseTool):
             max_workers=1  # Single document processing
         )
         
-        # Step 4: Process the document
+        # Step 3: Process the document
         conversion_result = await processor.convert_document(
             input_source=self.input_source,
             input_type=input_type
@@ -127,7 +149,7 @@ class ConvertSingleDocument(BaseTool):
         if not conversion_result.get("success"):
             return conversion_result
         
-        # Step 5: Save the markdown output
+        # Step 4: Save the markdown output
         base_filename = self.output_filename
         if not base_filename:
             base_filename = self._get_base_filename(self.input_source, input_type)
@@ -138,14 +160,19 @@ class ConvertSingleDocument(BaseTool):
             base_filename=base_filename
         )
         
+        # The Docling objects are only needed for saving; release them now
+        conversion_result.pop("document", None)
+        conversion_result.pop("conversion_result", None)
+        
         if not save_result.get("success"):
+            conversion_result.pop("markdown_content", None)
             return {
                 "success": False,
                 "error": f"Failed to save document: {save_result.get('error')}",
                 "conversion_result": conversion_result
             }
         
-        # Step 6: Prepare comprehensive results
+        # Step 5: Prepare comprehensive results
         result = {
             "success": True,
             "input_source": self.input_source,
@@ -161,9 +188,9 @@ class ConvertSingleDocument(BaseTool):
             "message": f"Successfully processed document and saved to {save_result.get('output_path')}"
         }
         
-        # Add preview of content
-        if conversion_result.get("markdown_content"):
-            content = conversion_result["markdown_content"]
+        # Add preview of content, then drop the full markdown before serialization
+        content = conversion_result.pop("markdown_content", None)
+        if content:
             preview_length = min(500, len(content))
             result["preview"] = content[:preview_length]
             if len(content) > preview_length:
@@ -173,25 +200,12 @@ class ConvertSingleDocument(BaseTool):
     
     def _get_base_filename(self, input_source: str, input_type: str) -> str:
         """Get a base filename from the input source"""
-        from urllib.parse import urlparse
-        import re
         from datetime import datetime
         
         if input_type == "file":
             return Path(input_source).stem
         elif input_type == "url":
-            parsed = urlparse(input_source)
-            path = parsed.path
-            
-            if path:
-                filename = path.split('/')[-1]
-                if filename:
-                    filename = filename.split('.')[0]
-                    return re.sub(r'[^a-zA-Z0-9_-]', '_', filename)
-            
-            # Fallback to domain name
-            domain = parsed.netloc.replace('www.', '')
-            return re.sub(r'[^a-zA-Z0-9_-]', '_', domain)
+            return base_filename_for_url(input_source)
         else:
             # For base64 or unknown types, use timestamp
             return f"document_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
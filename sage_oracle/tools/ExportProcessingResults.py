@@ -4,13 +4,323 @@ Export processed document results in various formats.
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import Dict, Any, List
-import json
-import csv
-import os
+from typing import Dict, Any, List, Optional
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 
+# Import our shared utilities; the tools folder is added to the import path once
+import sys
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps_compact as _dumps, dumps_bytes as _dumps_bytes
+
+# Prefer markupsafe's C escaper when available, falling back to the stdlib
+try:
+    from markupsafe import escape as _markup_escape
+
+    def _escape_html(value: Any) -> str:
+        return str(_markup_escape(value))
+except ImportError:
+    from html import escape as _stdlib_escape
+
+    def _escape_html(value: Any) -> str:
+        return _stdlib_escape(str(value))
+
+
+# Sample result skeleton shared by every _build_results call; treat as read-only
+_SAMPLE_OPERATION_INFO = {
+    "start_time": "2024-01-15T10:00:00Z",
+    "end_time": "2024-01-15T10:15:00Z",
+    "total_documents": 10,
+    "successful_documents": 9,
+    "failed_documents": 1,
+    "total_processing_time": 900.5
+}
+_SAMPLE_CHUNKS = [
+    {
+        "chunk_id": "chunk_1",
+        "content": "This is the first chunk of content...",
+        "start_position": 0,
+        "end_position": 500,
+        "embedding": [0.1, 0.2, 0.3]
+    }
+]
+_SAMPLE_IMAGES = [
+    {
+        "image_path": "/output/images/image1.png",
+        "description": "A chart showing data trends",
+        "position": 100
+    }
+]
+_SAMPLE_CONVERTED_DOC = {
+    "source": "document1.pdf",
+    "status": "success",
+    "output_path": "/output/document1.md",
+    "content_length": 2500,
+    "processing_time": 45.2,
+    "metadata": {
+        "file_size": 1024000,
+        "pages": 5,
+        "images_extracted": 3,
+        "chunks_created": 8
+    }
+}
+_SAMPLE_FAILED_DOC = {
+    "source": "document2.html",
+    "status": "failed",
+    "error": "Network timeout",
+    "processing_time": 30.0,
+    "metadata": {
+        "file_size": 512000,
+        "attempts": 3
+    }
+}
+
+
+@lru_cache(maxsize=128)
+def _build_results(operation_id: str, include_embeddings: bool, include_images: bool) -> Dict[str, Any]:
+    """
+    Build the processing results for an operation once per (operation, options) key.
+    
+    The returned dict is shared between calls and must be treated as read-only.
+    """
+    
+    # Simulate getting results from a database or storage system
+    # In a real implementation, this would query the actual results
+    
+    return {
+        "operation_id": operation_id,
+        "operation_info": _SAMPLE_OPERATION_INFO,
+        "documents": [
+            {
+                **_SAMPLE_CONVERTED_DOC,
+                "chunks": _SAMPLE_CHUNKS if include_embeddings else [],
+                "images": _SAMPLE_IMAGES if include_images else []
+            },
+            _SAMPLE_FAILED_DOC
+        ]
+    }
+
+
+# Export format -> exporter method; the single source of truth for supported formats
+_EXPORTERS = {
+    "json": "_export_json",
+    "csv": "_export_csv",
+    "markdown": "_export_markdown",
+    "html": "_export_html",
+    "msgpack": "_export_msgpack",
+    "cbor": "_export_cbor",
+}
+
+
+class _CountingWriter:
+    """File wrapper that tallies the bytes written, so exports need no stat() afterwards"""
+    __slots__ = ("f", "n")
+    
+    def __init__(self, f):
+        self.f = f
+        self.n = 0
+    
+    def write(self, data: bytes) -> int:
+        self.n += len(data)
+        return self.f.write(data)
+
+
+class _CountingTextWriter(_CountingWriter):
+    """Counting writer that UTF-8 encodes text, for writers such as csv that emit str"""
+    __slots__ = ()
+    
+    def write(self, text: str) -> int:
+        return _CountingWriter.write(self, text.encode('utf-8'))
+
+
+# CSV export schema: base document columns, then optional metadata columns
+_CSV_FIELDS = ("source", "status", "output_path", "content_length", "processing_time", "error")
+_CSV_METADATA_FIELDS = ("file_size", "pages", "images_extracted", "chunks_created")
+_CSV_NO_METADATA = ("",) * len(_CSV_METADATA_FIELDS)
+
+
+def _csv_row(doc: Dict[str, Any], include_metadata: bool) -> tuple:
+    """Build one positional CSV row matching the export schema"""
+    row = (
+        doc.get("source", ""),
+        doc.get("status", ""),
+        doc.get("output_path", ""),
+        doc.get("content_length", 0),
+        doc.get("processing_time", 0),
+        doc.get("error", "")
+    )
+    if not include_metadata:
+        return row
+    
+    metadata = doc.get("metadata")
+    if metadata is None:
+        return row + _CSV_NO_METADATA
+    return row + (
+        metadata.get("file_size", 0),
+        metadata.get("pages", 0),
+        metadata.get("images_extracted", 0),
+        metadata.get("chunks_created", 0)
+    )
+
+
+class _TemplateView(dict):
+    """Copy of a record whose missing keys resolve to template defaults for str.format_map"""
+    
+    __slots__ = ("_defaults",)
+    
+    def __init__(self, data: Dict[str, Any], defaults: Dict[str, Any]):
+        super().__init__(data)
+        self._defaults = defaults
+    
+    def __missing__(self, key):
+        return self._defaults[key]
+
+
+class _EscapedTemplateView(_TemplateView):
+    """_TemplateView whose values are HTML-escaped as the template reads them"""
+    
+    __slots__ = ()
+    
+    def __getitem__(self, key):
+        return _escape_html(super().__getitem__(key))
+
+
+# Values shown for fields missing from a record
+_OPERATION_DEFAULTS = {
+    "start_time": "N/A",
+    "end_time": "N/A",
+    "total_documents": 0,
+    "successful_documents": 0,
+    "failed_documents": 0,
+    "total_processing_time": 0
+}
+_DOC_DEFAULTS = {
+    "source": "Unknown",
+    "status": "Unknown",
+    "output_path": "N/A",
+    "content_length": 0,
+    "processing_time": 0
+}
+_METADATA_DEFAULTS = {
+    "file_size": 0,
+    "pages": 0,
+    "images_extracted": 0,
+    "chunks_created": 0
+}
+_IMAGE_DEFAULTS = {
+    "image_path": "Unknown",
+    "description": "No description"
+}
+
+# Markdown export templates
+_MD_HEADER_TMPL = """# Processing Results Export
+
+## Operation Information
+- **Operation ID**: {operation_id}
+- **Start Time**: {start_time}
+- **End Time**: {end_time}
+- **Total Documents**: {total_documents}
+- **Successful Documents**: {successful_documents}
+- **Failed Documents**: {failed_documents}
+- **Total Processing Time**: {total_processing_time} seconds
+
+## Document Results
+
+"""
+
+_MD_DOC_TMPL = """### Document {index}: {source}
+
+- **Status**: {status}
+- **Output Path**: {output_path}
+- **Content Length**: {content_length} characters
+- **Processing Time**: {processing_time} seconds
+
+"""
+
+_MD_ERROR_TMPL = "- **Error**: {error}\n\n"
+
+_MD_METADATA_TMPL = """#### Metadata
+- **File Size**: {file_size} bytes
+- **Pages**: {pages}
+- **Images Extracted**: {images_extracted}
+- **Chunks Created**: {chunks_created}
+
+"""
+
+_MD_IMAGE_TMPL = "- **{image_path}**: {description}\n"
+
+# HTML export templates
+_HTML_HEADER_TMPL = """<!DOCTYPE html>
+<html>
+<head>
+    <title>Processing Results - {operation_id}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 40px; }}
+        .header {{ background-color: #f0f0f0; padding: 20px; border-radius: 5px; }}
+        .document {{ margin: 20px 0; padding: 15px; border: 1px solid #ddd; border-radius: 5px; }}
+        .success {{ background-color: #d4edda; }}
+        .failed {{ background-color: #f8d7da; }}
+        .metadata {{ background-color: #f8f9fa; padding: 10px; margin: 10px 0; border-radius: 3px; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>Processing Results Export</h1>
+        <h2>Operation Information</h2>
+        <ul>
+            <li><strong>Operation ID</strong>: {operation_id}</li>
+            <li><strong>Start Time</strong>: {start_time}</li>
+            <li><strong>End Time</strong>: {end_time}</li>
+            <li><strong>Total Documents</strong>: {total_documents}</li>
+            <li><strong>Successful Documents</strong>: {successful_documents}</li>
+            <li><strong>Failed Documents</strong>: {failed_documents}</li>
+            <li><strong>Total Processing Time</strong>: {total_processing_time} seconds</li>
+        </ul>
+    </div>
+    
+    <h2>Document Results</h2>
+"""
+
+_HTML_DOC_TMPL = """
+    <div class="document {status_class}">
+        <h3>Document {index}: {source}</h3>
+        <ul>
+            <li><strong>Status</strong>: {status}</li>
+            <li><strong>Output Path</strong>: {output_path}</li>
+            <li><strong>Content Length</strong>: {content_length} characters</li>
+            <li><strong>Processing Time</strong>: {processing_time} seconds</li>
+"""
+
+_HTML_ERROR_TMPL = "            <li><strong>Error</strong>: {error}</li>\n"
+
+_HTML_METADATA_TMPL = """
+        <div class="metadata">
+            <h4>Metadata</h4>
+            <ul>
+                <li><strong>File Size</strong>: {file_size} bytes</li>
+                <li><strong>Pages</strong>: {pages}</li>
+                <li><strong>Images Extracted</strong>: {images_extracted}</li>
+                <li><strong>Chunks Created</strong>: {chunks_created}</li>
+            </ul>
+        </div>
+"""
+
+_HTML_IMAGES_OPEN = """
+        <h4>Images</h4>
+        <ul>
+"""
+
+_HTML_IMAGE_TMPL = "            <li><strong>{image_path}</strong>: {description}</li>\n"
+
+_HTML_FOOTER = """
+</body>
+</html>
+"""
+
+
 class ExportProcessingResults(BaseTool):
     """
     Export processed document results in various formats, providing flexible 
@@ -24,7 +334,12 @@ class ExportProcessingResults(BaseTool):
     
     export_format: str = Field(
         default="json",
-        description="Export format: 'json', 'csv', 'markdown', 'html'"
+        description="Export format: 'json', 'csv', 'markdown', 'html', 'msgpack', 'cbor'"
+    )
+    
+    export_formats: Optional[List[str]] = Field(
+        default=None,
+        description="Export several formats at once, written concurrently (overrides export_format). Files share the output_path stem with one extension per format."
     )
     
     include_embeddings: bool = Field(
@@ -46,6 +361,11 @@ class ExportProcessingResults(BaseTool):
         default=True,
         description="Include processing metadata in export"
     )
+    
+    rows_per_chunk: int = Field(
+        default=1024,
+        description="Number of documents rendered and written per chunk for CSV, Markdown and HTML exports"
+    )
 
     def run(self):
         """
@@ -53,95 +373,54 @@ class ExportProcessingResults(BaseTool):
         """
         try:
             # Step 1: Validate inputs
-            valid_formats = ["json", "csv", "markdown", "html"]
-            if self.export_format not in valid_formats:
-                return json.dumps({
+            formats = list(dict.fromkeys(self.export_formats)) if self.export_formats else [self.export_format]
+            if any(fmt not in _EXPORTERS for fmt in formats):
+                return _dumps({
+                    "success": False,
+                    "error": f"Invalid export format. Must be one of: {list(_EXPORTERS)}"
+                })
+            
+            if self.rows_per_chunk < 1:
+                return _dumps({
                     "success": False,
-                    "error": f"Invalid export format. Must be one of: {valid_formats}"
-                }, indent=2)
+                    "error": "rows_per_chunk must be at least 1"
+                })
             
             # Step 2: Get processing results
             results_data = self._get_processing_results()
             if not results_data:
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": f"No results found for operation ID: {self.operation_id}"
-                }, indent=2)
+                })
             
-            # Step 3: Export in requested format
-            export_result = self._export_results(results_data)
-            return json.dumps(export_result, indent=2, ensure_ascii=False)
+            # Step 3: Export in requested format(s), sharing the results across formats
+            if self.export_formats:
+                export_result = self._export_multiple(results_data, formats)
+            else:
+                export_result = self._export_results(results_data)
+            return _dumps(export_result)
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
     
     def _get_processing_results(self) -> Dict[str, Any]:
         """Get processing results for the operation"""
-        
-        # Simulate getting results from a database or storage system
-        # In a real implementation, this would query the actual results
-        
-        sample_results = {
-            "operation_id": self.operation_id,
-            "operation_info": {
-                "start_time": "2024-01-15T10:00:00Z",
-                "end_time": "2024-01-15T10:15:00Z",
-                "total_documents": 10,
-                "successful_documents": 9,
-                "failed_documents": 1,
-                "total_processing_time": 900.5
-            },
-            "documents": [
-                {
-                    "source": "document1.pdf",
-                    "status": "success",
-                    "output_path": "/output/document1.md",
-                    "content_length": 2500,
-                    "processing_time": 45.2,
-                    "metadata": {
-                        "file_size": 1024000,
-                        "pages": 5,
-                        "images_extracted": 3,
-                        "chunks_created": 8
-                    },
-                    "chunks": [
-                        {
-                            "chunk_id": "chunk_1",
-                            "content": "This is the first chunk of content...",
-                            "start_position": 0,
-                            "end_position": 500,
-                            "embedding": [0.1, 0.2, 0.3] if self.include_embeddings else None
-                        }
-                    ] if self.include_embeddings else [],
-                    "images": [
-                        {
-                            "image_path": "/output/images/image1.png",
-                            "description": "A chart showing data trends",
-                            "position": 100
-                        }
-                    ] if self.include_images else []
-                },
-                {
-                    "source": "document2.html",
-                    "status": "failed",
-                    "error": "Network timeout",
-                    "processing_time": 30.0,
-                    "metadata": {
-                        "file_size": 512000,
-                        "attempts": 3
-                    }
-                }
-            ]
-        }
-        
-        return sample_results
+        return _build_results(self.operation_id, self.include_embeddings, self.include_images)
     
     def _export_results(self, results_data: Dict[str, Any]) -> Dict[str, Any]:
         """Export results in the specified format"""
         
+        exporter = _EXPORTERS.get(self.export_format)
+        if exporter is None:
+            return {
+                "success": False,
+                "error": f"Unsupported export format: {self.export_format}"
+            }
+        
         # Determine output path
         if not self.output_path:
             export_dir = Path("exports")
@@ -154,39 +433,64 @@ class ExportProcessingResults(BaseTool):
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            if self.export_format == "json":
-                return self._export_json(results_data, output_path)
-            elif self.export_format == "csv":
-                return self._export_csv(results_data, output_path)
-            elif self.export_format == "markdown":
-                return self._export_markdown(results_data, output_path)
-            elif self.export_format == "html":
-                return self._export_html(results_data, output_path)
-            else:
-                return {
-                    "success": False,
-                    "error": f"Unsupported export format: {self.export_format}"
-                }
+            return getattr(self, exporter)(results_data, output_path)
         except Exception as e:
             return {
                 "success": False,
                 "error": f"Failed to export results: {str(e)}"
             }
     
+    def _export_multiple(self, results_data: Dict[str, Any], formats: List[str]) -> Dict[str, Any]:
+        """Export results to several formats concurrently, one file per format"""
+        
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # Determine the shared output stem
+        if self.output_path:
+            base_path = Path(self.output_path).with_suffix("")
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base_path = Path("exports") / f"{self.operation_id}_{timestamp}"
+        base_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        def export_one(fmt: str) -> Dict[str, Any]:
+            output_path = base_path.parent / f"{base_path.name}.{fmt}"
+            try:
+                result = getattr(self, _EXPORTERS[fmt])(results_data, output_path)
+            except Exception as e:
+                result = {
+                    "success": False,
+                    "error": f"Failed to export results: {str(e)}"
+                }
+            result.setdefault("export_format", fmt)
+            return result
+        
+        # Exports are I/O-bound, so write every format on its own thread
+        with ThreadPoolExecutor(max_workers=len(formats)) as executor:
+            exports = list(executor.map(export_one, formats))
+        
+        successful = sum(1 for export in exports if export["success"])
+        return {
+            "success": successful == len(exports),
+            "exports": exports,
+            "message": f"Exported {successful} of {len(exports)} formats for operation {self.operation_id}"
+        }
+    
     def _export_json(self, results_data: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
         """Export results as JSON"""
         
         # Filter data based on options
-        export_data = self._filter_export_data(results_data)
+        export_data = self._build_export_data(results_data)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(export_data, f, indent=2, ensure_ascii=False)
+        with open(output_path, 'wb') as raw:
+            f = _CountingWriter(raw)
+            f.write(_dumps_bytes(export_data))
         
         return {
             "success": True,
             "export_format": "json",
             "output_path": str(output_path),
-            "file_size": output_path.stat().st_size,
+            "file_size": f.n,
             "document_count": len(export_data.get("documents", [])),
             "message": f"Results exported to {output_path}"
         }
@@ -194,6 +498,8 @@ class ExportProcessingResults(BaseTool):
     def _export_csv(self, results_data: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
         """Export results as CSV"""
         
+        import csv
+        
         documents = results_data.get("documents", [])
         if not documents:
             return {
@@ -201,43 +507,25 @@ class ExportProcessingResults(BaseTool):
                 "error": "No documents to export"
             }
         
-        # Prepare CSV data
-        csv_data = []
-        for doc in documents:
-            row = {
-                "source": doc.get("source", ""),
-                "status": doc.get("status", ""),
-                "output_path": doc.get("output_path", ""),
-                "content_length": doc.get("content_length", 0),
-                "processing_time": doc.get("processing_time", 0),
-                "error": doc.get("error", "")
-            }
-            
-            # Add metadata if requested
-            if self.include_metadata and "metadata" in doc:
-                metadata = doc["metadata"]
-                row.update({
-                    "file_size": metadata.get("file_size", 0),
-                    "pages": metadata.get("pages", 0),
-                    "images_extracted": metadata.get("images_extracted", 0),
-                    "chunks_created": metadata.get("chunks_created", 0)
-                })
-            
-            csv_data.append(row)
+        # Metadata columns follow the first document, as the header always has
+        include_metadata = self.include_metadata and "metadata" in documents[0]
+        fieldnames = _CSV_FIELDS + _CSV_METADATA_FIELDS if include_metadata else _CSV_FIELDS
         
-        # Write CSV file
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            if csv_data:
-                writer = csv.DictWriter(f, fieldnames=csv_data[0].keys())
-                writer.writeheader()
-                writer.writerows(csv_data)
+        # Write CSV file one slice of rows_per_chunk documents at a time
+        step = self.rows_per_chunk
+        with open(output_path, 'wb', buffering=1 << 20) as raw:
+            f = _CountingTextWriter(raw)
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            for start in range(0, len(documents), step):
+                writer.writerows([_csv_row(doc, include_metadata) for doc in documents[start:start + step]])
         
         return {
             "success": True,
             "export_format": "csv",
             "output_path": str(output_path),
-            "file_size": output_path.stat().st_size,
-            "document_count": len(csv_data),
+            "file_size": f.n,
+            "document_count": len(documents),
             "message": f"Results exported to {output_path}"
         }
     
@@ -245,197 +533,197 @@ class ExportProcessingResults(BaseTool):
         """Export results as Markdown"""
         
         documents = results_data.get("documents", [])
-        operation_info = results_data.get("operation_info", {})
         
-        markdown_content = f"""# Processing Results Export
-
-## Operation Information
-- **Operation ID**: {self.operation_id}
-- **Start Time**: {operation_info.get('start_time', 'N/A')}
-- **End Time**: {operation_info.get('end_time', 'N/A')}
-- **Total Documents**: {operation_info.get('total_documents', 0)}
-- **Successful Documents**: {operation_info.get('successful_documents', 0)}
-- **Failed Documents**: {operation_info.get('failed_documents', 0)}
-- **Total Processing Time**: {operation_info.get('total_processing_time', 0)} seconds
-
-## Document Results
-
-"""
+        operation_info = _TemplateView(results_data.get("operation_info", {}), _OPERATION_DEFAULTS)
+        operation_info["operation_id"] = self.operation_id
         
-        for i, doc in enumerate(documents, 1):
-            markdown_content += f"""### Document {i}: {doc.get('source', 'Unknown')}
-
-- **Status**: {doc.get('status', 'Unknown')}
-- **Output Path**: {doc.get('output_path', 'N/A')}
-- **Content Length**: {doc.get('content_length', 0)} characters
-- **Processing Time**: {doc.get('processing_time', 0)} seconds
-
-"""
-            
-            if doc.get('error'):
-                markdown_content += f"- **Error**: {doc['error']}\n\n"
-            
-            if self.include_metadata and "metadata" in doc:
-                metadata = doc["metadata"]
-                markdown_content += f"""#### Metadata
-- **File Size**: {metadata.get('file_size', 0)} bytes
-- **Pages**: {metadata.get('pages', 0)}
-- **Images Extracted**: {metadata.get('images_extracted', 0)}
-- **Chunks Created**: {metadata.get('chunks_created', 0)}
-
-"""
-            
-            if self.include_images and "images" in doc:
-                images = doc["images"]
-                if images:
-                    markdown_content += "#### Images\n"
-                    for img in images:
-                        markdown_content += f"- **{img.get('image_path', 'Unknown')}**: {img.get('description', 'No description')}\n"
-                    markdown_content += "\n"
-        
-        # Write markdown file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Write markdown file through a large block buffer, rendering rows_per_chunk documents per write
+        step = self.rows_per_chunk
+        with open(output_path, 'wb', buffering=1 << 20) as raw:
+            f = _CountingWriter(raw)
+            f.write(_MD_HEADER_TMPL.format_map(operation_info).encode('utf-8'))
+            for start in range(0, len(documents), step):
+                parts = [
+                    self._markdown_document(i, doc)
+                    for i, doc in enumerate(documents[start:start + step], start + 1)
+                ]
+                f.write(''.join(parts).encode('utf-8'))
         
         return {
             "success": True,
             "export_format": "markdown",
             "output_path": str(output_path),
-            "file_size": output_path.stat().st_size,
+            "file_size": f.n,
             "document_count": len(documents),
             "message": f"Results exported to {output_path}"
         }
     
+    def _markdown_document(self, index: int, doc: Dict[str, Any]) -> str:
+        """Render the Markdown section for a single document"""
+        
+        view = _TemplateView(doc, _DOC_DEFAULTS)
+        view["index"] = index
+        parts = [_MD_DOC_TMPL.format_map(view)]
+        
+        if doc.get('error'):
+            parts.append(_MD_ERROR_TMPL.format_map(view))
+        
+        if self.include_metadata and "metadata" in doc:
+            parts.append(_MD_METADATA_TMPL.format_map(_TemplateView(doc["metadata"], _METADATA_DEFAULTS)))
+        
+        if self.include_images and "images" in doc:
+            images = doc["images"]
+            if images:
+                parts.append("#### Images\n")
+                parts.extend(_MD_IMAGE_TMPL.format_map(_TemplateView(img, _IMAGE_DEFAULTS)) for img in images)
+                parts.append("\n")
+        
+        return ''.join(parts)
+    
     def _export_html(self, results_data: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
         """Export results as HTML"""
         
         documents = results_data.get("documents", [])
-        operation_info = results_data.get("operation_info", {})
         
-        html_content = f"""<!DOCTYPE html>
-<html>
-<head>
-    <title>Processing Results - {self.operation_id}</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; margin: 40px; }}
-        .header {{ background-color: #f0f0f0; padding: 20px; border-radius: 5px; }}
-        .document {{ margin: 20px 0; padding: 15px; border: 1px solid #ddd; border-radius: 5px; }}
-        .success {{ background-color: #d4edda; }}
-        .failed {{ background-color: #f8d7da; }}
-        .metadata {{ background-color: #f8f9fa; padding: 10px; margin: 10px 0; border-radius: 3px; }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>Processing Results Export</h1>
-        <h2>Operation Information</h2>
-        <ul>
-            <li><strong>Operation ID</strong>: {self.operation_id}</li>
-            <li><strong>Start Time</strong>: {operation_info.get('start_time', 'N/A')}</li>
-            <li><strong>End Time</strong>: {operation_info.get('end_time', 'N/A')}</li>
-            <li><strong>Total Documents</strong>: {operation_info.get('total_documents', 0)}</li>
-            <li><strong>Successful Documents</strong>: {operation_info.get('successful_documents', 0)}</li>
-            <li><strong>Failed Documents</strong>: {operation_info.get('failed_documents', 0)}</li>
-            <li><strong>Total Processing Time</strong>: {operation_info.get('total_processing_time', 0)} seconds</li>
-        </ul>
-    </div>
+        operation_info = _EscapedTemplateView(results_data.get("operation_info", {}), _OPERATION_DEFAULTS)
+        operation_info["operation_id"] = self.operation_id
+        
+        # Write HTML file through a large block buffer, rendering rows_per_chunk documents per write
+        step = self.rows_per_chunk
+        with open(output_path, 'wb', buffering=1 << 20) as raw:
+            f = _CountingWriter(raw)
+            f.write(_HTML_HEADER_TMPL.format_map(operation_info).encode('utf-8'))
+            for start in range(0, len(documents), step):
+                parts = [
+                    self._html_document(i, doc)
+                    for i, doc in enumerate(documents[start:start + step], start + 1)
+                ]
+                f.write(''.join(parts).encode('utf-8'))
+            f.write(_HTML_FOOTER.encode('utf-8'))
+        
+        return {
+            "success": True,
+            "export_format": "html",
+            "output_path": str(output_path),
+            "file_size": f.n,
+            "document_count": len(documents),
+            "message": f"Results exported to {output_path}"
+        }
     
-    <h2>Document Results</h2>
-"""
+    def _html_document(self, index: int, doc: Dict[str, Any]) -> str:
+        """Render the HTML section for a single document"""
         
-        for i, doc in enumerate(documents, 1):
-            status_class = "success" if doc.get('status') == 'success' else "failed"
-            html_content += f"""
-    <div class="document {status_class}">
-        <h3>Document {i}: {doc.get('source', 'Unknown')}</h3>
-        <ul>
-            <li><strong>Status</strong>: {doc.get('status', 'Unknown')}</li>
-            <li><strong>Output Path</strong>: {doc.get('output_path', 'N/A')}</li>
-            <li><strong>Content Length</strong>: {doc.get('content_length', 0)} characters</li>
-            <li><strong>Processing Time</strong>: {doc.get('processing_time', 0)} seconds</li>
-"""
-            
-            if doc.get('error'):
-                html_content += f"            <li><strong>Error</strong>: {doc['error']}</li>\n"
-            
-            html_content += "        </ul>\n"
-            
-            if self.include_metadata and "metadata" in doc:
-                metadata = doc["metadata"]
-                html_content += f"""
-        <div class="metadata">
-            <h4>Metadata</h4>
-            <ul>
-                <li><strong>File Size</strong>: {metadata.get('file_size', 0)} bytes</li>
-                <li><strong>Pages</strong>: {metadata.get('pages', 0)}</li>
-                <li><strong>Images Extracted</strong>: {metadata.get('images_extracted', 0)}</li>
-                <li><strong>Chunks Created</strong>: {metadata.get('chunks_created', 0)}</li>
-            </ul>
-        </div>
-"""
-            
-            if self.include_images and "images" in doc:
-                images = doc["images"]
-                if images:
-                    html_content += """
-        <h4>Images</h4>
-        <ul>
-"""
-                    for img in images:
-                        html_content += f"            <li><strong>{img.get('image_path', 'Unknown')}</strong>: {img.get('description', 'No description')}</li>\n"
-                    html_content += "        </ul>\n"
-            
-            html_content += "    </div>\n"
+        view = _EscapedTemplateView(doc, _DOC_DEFAULTS)
+        view["index"] = index
+        view["status_class"] = "success" if doc.get('status') == 'success' else "failed"
+        parts = [_HTML_DOC_TMPL.format_map(view)]
         
-        html_content += """
-</body>
-</html>
-"""
+        if doc.get('error'):
+            parts.append(_HTML_ERROR_TMPL.format_map(view))
+        
+        parts.append("        </ul>\n")
+        
+        if self.include_metadata and "metadata" in doc:
+            parts.append(_HTML_METADATA_TMPL.format_map(_EscapedTemplateView(doc["metadata"], _METADATA_DEFAULTS)))
+        
+        if self.include_images and "images" in doc:
+            images = doc["images"]
+            if images:
+                parts.append(_HTML_IMAGES_OPEN)
+                parts.extend(_HTML_IMAGE_TMPL.format_map(_EscapedTemplateView(img, _IMAGE_DEFAULTS)) for img in images)
+                parts.append("        </ul>\n")
+        
+        parts.append("    </div>\n")
+        return ''.join(parts)
+    
+    def _export_msgpack(self, results_data: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
+        """Export results as MessagePack"""
+        
+        try:
+            import msgpack
+        except ImportError as e:
+            return {
+                "success": False,
+                "error": f"Failed to import msgpack. Please install it with 'pip install msgpack'. Error: {str(e)}"
+            }
+        
+        export_data = self._build_export_data(results_data)
         
-        # Write HTML file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        with open(output_path, 'wb') as raw:
+            f = _CountingWriter(raw)
+            msgpack.pack(export_data, f, use_bin_type=True)
         
         return {
             "success": True,
-            "export_format": "html",
+            "export_format": "msgpack",
             "output_path": str(output_path),
-            "file_size": output_path.stat().st_size,
-            "document_count": len(documents),
+            "file_size": f.n,
+            "document_count": len(export_data.get("documents", [])),
             "message": f"Results exported to {output_path}"
         }
     
-    def _filter_export_data(self, results_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Filter export data based on options"""
-        
-        filtered_data = results_data.copy()
-        
-        # Filter documents
-        if "documents" in filtered_data:
-            filtered_docs = []
-            for doc in filtered_data["documents"]:
-                filtered_doc = doc.copy()
-                
-                # Remove embeddings if not requested
-                if not self.include_embeddings and "chunks" in filtered_doc:
-                    for chunk in filtered_doc["chunks"]:
-                        if "embedding" in chunk:
-                            del chunk["embedding"]
-                
-                # Remove images if not requested
-                if not self.include_images and "images" in filtered_doc:
-                    del filtered_doc["images"]
-                
-                # Remove metadata if not requested
-                if not self.include_metadata and "metadata" in filtered_doc:
-                    del filtered_doc["metadata"]
-                
-                filtered_docs.append(filtered_doc)
-            
-            filtered_data["documents"] = filtered_docs
+    def _export_cbor(self, results_data: Dict[str, Any], output_path: Path) -> Dict[str, Any]:
+        """Export results as CBOR"""
         
-        return filtered_data
-
+        try:
+            import cbor2
+        except ImportError as e:
+            return {
+                "success": False,
+                "error": f"Failed to import cbor2. Please install it with 'pip install cbor2'. Error: {str(e)}"
+            }
+        
+        export_data = self._build_export_data(results_data)
+        
+        with open(output_path, 'wb') as raw:
+            f = _CountingWriter(raw)
+            cbor2.dump(export_data, f)
+        
+        return {
+            "success": True,
+            "export_format": "cbor",
+            "output_path": str(output_path),
+            "file_size": f.n,
+            "document_count": len(export_data.get("documents", [])),
+            "message": f"Results exported to {output_path}"
+        }
+    
+    def _build_export_data(self, results_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the structured export payload, filtering documents in a single pass"""
+        if "documents" not in results_data:
+            return results_data
+        
+        # Nothing to filter out: hand the payload through without copying it
+        if self.include_images and self.include_metadata:
+            if self.include_embeddings or not any(doc.get("chunks") for doc in results_data["documents"]):
+                return results_data
+        
+        return {
+            **results_data,
+            "documents": list(self._iter_filtered_docs(results_data["documents"]))
+        }
+    
+    def _iter_filtered_docs(self, documents: List[Dict[str, Any]]):
+        """Yield each document restricted to the fields selected by the include_* options"""
+        
+        dropped = set()
+        if not self.include_images:
+            dropped.add("images")
+        if not self.include_metadata:
+            dropped.add("metadata")
+        strip_embeddings = not self.include_embeddings
+        
+        for doc in documents:
+            filtered_doc = {key: value for key, value in doc.items() if key not in dropped}
+            
+            # Remove embeddings if not requested (copy the chunks, which may be shared)
+            if strip_embeddings and "chunks" in filtered_doc:
+                filtered_doc["chunks"] = [
+                    {key: value for key, value in chunk.items() if key != "embedding"}
+                    for chunk in filtered_doc["chunks"]
+                ]
+            
+            yield filtered_doc
 
 if __name__ == "__main__":
     # Test the tool
@@ -5,14 +5,15 @@ Monitor and report on active document processing operations.
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 from typing import Dict, Any, Optional
-import json
 from datetime import datetime, timedelta
 
-# Import our shared utilities
+# Import our shared utilities; the tools folder is added to the import path once
 import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent))
-from utils.concurrency.batch_processor import BatchProcessor
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps_compact as _dumps
 
 class MonitorProcessingStatus(BaseTool):
     """
@@ -42,20 +43,20 @@ class MonitorProcessingStatus(BaseTool):
         try:
             # Step 1: Validate inputs
             if not (1 <= self.refresh_interval <= 60):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "refresh_interval must be between 1 and 60 seconds"
-                }, indent=2)
+                })
             
             # Step 2: Get monitoring data
             result = self._get_monitoring_data()
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            return _dumps(result)
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
     
     def _get_monitoring_data(self) -> Dict[str, Any]:
         """Get monitoring data for operations"""
@@ -74,13 +75,16 @@ class MonitorProcessingStatus(BaseTool):
     def _get_operation_status(self, operation_id: str) -> Dict[str, Any]:
         """Get status of a specific operation"""
         
+        # Read the clock once and derive every timestamp from it; the serializer formats them
+        now = datetime.now()
+        
         # Simulate operation data
         # In a real implementation, this would query the actual operation status
         operation_data = {
             "operation_id": operation_id,
             "status": "completed",  # completed, processing, failed, pending
-            "start_time": (datetime.now() - timedelta(minutes=5)).isoformat(),
-            "end_time": datetime.now().isoformat(),
+            "start_time": now - timedelta(minutes=5),
+            "end_time": now,
             "total_documents": 10,
             "processed_documents": 10,
             "successful_documents": 9,
@@ -119,19 +123,22 @@ class MonitorProcessingStatus(BaseTool):
             "success": True,
             "operation_id": operation_id,
             "operation_data": operation_data,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "refresh_interval": self.refresh_interval
         }
     
     def _get_all_operations_status(self) -> Dict[str, Any]:
         """Get status of all operations"""
         
+        # Read the clock once and derive every timestamp from it; the serializer formats them
+        now = datetime.now()
+        
         # Simulate multiple operations
         operations = [
             {
                 "operation_id": "batch_001",
                 "status": "processing",
-                "start_time": (datetime.now() - timedelta(minutes=2)).isoformat(),
+                "start_time": now - timedelta(minutes=2),
                 "total_documents": 25,
                 "processed_documents": 15,
                 "successful_documents": 14,
@@ -142,8 +149,8 @@ class MonitorProcessingStatus(BaseTool):
             {
                 "operation_id": "batch_002",
                 "status": "completed",
-                "start_time": (datetime.now() - timedelta(minutes=10)).isoformat(),
-                "end_time": (datetime.now() - timedelta(minutes=1)).isoformat(),
+                "start_time": now - timedelta(minutes=10),
+                "end_time": now - timedelta(minutes=1),
                 "total_documents": 5,
                 "processed_documents": 5,
                 "successful_documents": 5,
@@ -154,8 +161,8 @@ class MonitorProcessingStatus(BaseTool):
             {
                 "operation_id": "batch_003",
                 "status": "failed",
-                "start_time": (datetime.now() - timedelta(minutes=15)).isoformat(),
-                "end_time": (datetime.now() - timedelta(minutes=12)).isoformat(),
+                "start_time": now - timedelta(minutes=15),
+                "end_time": now - timedelta(minutes=12),
                 "total_documents": 3,
                 "processed_documents": 1,
                 "successful_documents": 0,
@@ -166,16 +173,23 @@ class MonitorProcessingStatus(BaseTool):
             }
         ]
         
-        # Calculate summary statistics
+        # Calculate summary statistics in a single pass
         total_operations = len(operations)
-        active_operations = sum(1 for op in operations if op["status"] == "processing")
-        completed_operations = sum(1 for op in operations if op["status"] == "completed")
-        failed_operations = sum(1 for op in operations if op["status"] == "failed")
+        status_counts = {"processing": 0, "completed": 0, "failed": 0}
+        total_documents = total_processed = total_successful = total_failed = 0
+        
+        for op in operations:
+            status = op["status"]
+            if status in status_counts:
+                status_counts[status] += 1
+            total_documents += op["total_documents"]
+            total_processed += op["processed_documents"]
+            total_successful += op["successful_documents"]
+            total_failed += op["failed_documents"]
         
-        total_documents = sum(op["total_documents"] for op in operations)
-        total_processed = sum(op["processed_documents"] for op in operations)
-        total_successful = sum(op["successful_documents"] for op in operations)
-        total_failed = sum(op["failed_documents"] for op in operations)
+        active_operations = status_counts["processing"]
+        completed_operations = status_counts["completed"]
+        failed_operations = status_counts["failed"]
         
         result = {
             "success": True,
@@ -191,7 +205,7 @@ class MonitorProcessingStatus(BaseTool):
                 "overall_success_rate": (total_successful / total_processed * 100) if total_processed > 0 else 0
             },
             "operations": operations,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now,
             "refresh_interval": self.refresh_interval
         }
         
@@ -5,17 +5,28 @@ Process all documents in a specified folder with concurrent execution.
 from agency_swarm.tools import BaseTool
 from pydantic import Field
 from typing import List, Dict, Any
-import json
-import asyncio
+from functools import partial
+import stat
 from pathlib import Path
 
-# Import our shared utilities
+# Import our shared utilities; the tools folder is added to the import path once
 import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent))
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps as _dumps, without_none
 from utils.docling_processor import DoclingProcessor
+from utils.processor_pool import process_many, collect_results
 from utils.input_sources.folder_input_source import FolderInputSource
 from utils.concurrency.batch_processor import BatchProcessor
+from utils.event_loop import run_coroutine
+
+async def _prepend(first, rest):
+    """Yield an already-consumed first item followed by the rest of an async iterator"""
+    yield first
+    async for item in rest:
+        yield item
+
 
 class ProcessFolderPipeline(BaseTool):
     """
@@ -58,34 +69,38 @@ class ProcessFolderPipeline(BaseTool):
         Execute folder-based document processing pipeline.
         """
         try:
-            # Step 1: Validate inputs
-            if not Path(self.folder_path).exists():
-                return json.dumps({
+            # Step 1: Validate inputs with a single stat call
+            folder = Path(self.folder_path)
+            try:
+                folder_mode = folder.stat().st_mode
+            except (FileNotFoundError, NotADirectoryError):
+                return _dumps({
                     "success": False,
                     "error": f"Folder not found: {self.folder_path}"
-                }, indent=2)
+                })
             
-            if not Path(self.folder_path).is_dir():
-                return json.dumps({
+            if not stat.S_ISDIR(folder_mode):
+                return _dumps({
                     "success": False,
                     "error": f"Path is not a directory: {self.folder_path}"
-                }, indent=2)
+                })
             
             if not (1 <= self.max_concurrent <= 50):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "max_concurrent must be between 1 and 50"
-                }, indent=2)
+                })
             
             # Step 2: Run async processing
-            result = asyncio.run(self._process_folder_async())
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            self._folder = folder
+            result = run_coroutine(self._process_folder_async())
+            return _dumps(result)
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
     
     async def _process_folder_async(self) -> Dict[str, Any]:
         """Asynchronous folder processing implementation"""
@@ -96,10 +111,11 @@ class ProcessFolderPipeline(BaseTool):
             file_patterns=self.file_patterns
         )
         
-        # Step 2: Get documents to process
-        documents = await input_source.get_documents()
+        # Step 2: Stream documents to process, peeking at the first to detect an empty folder
+        documents = input_source.iter_documents()
+        first_document = await anext(documents, None)
         
-        if not documents:
+        if first_document is None:
             return {
                 "success": False,
                 "error": f"No documents found in folder {self.folder_path} matching patterns {self.file_patterns}"
@@ -115,47 +131,20 @@ class ProcessFolderPipeline(BaseTool):
         
         batch_processor = BatchProcessor(max_concurrent=self.max_concurrent)
         
-        # Step 4: Process documents
+        # Step 4: Process documents, several per Docling call as they are discovered
         batch_result = await batch_processor.process_documents(
-            documents=documents,
-            processor_func=self._process_single_document,
-            batch_id=f"folder_{Path(self.folder_path).name}"
+            documents=_prepend(first_document, documents),
+            processor_func=partial(
+                process_many,
+                annotate_images=self.annotate_images,
+                images_scale=self.images_scale,
+                save_images_as_files=self.save_images_as_files
+            ),
+            batch_id=f"folder_{self._folder.name}"
         )
         
-        # Step 5: Prepare results
-        results = []
-        for result in batch_result.results:
-            if result.success:
-                # Save the markdown output
-                doc_result = result.result
-                if doc_result.get("success"):
-                    save_result = processor.save_markdown(
-                        document=doc_result["document"],
-                        output_path="",  # Will be determined by save_markdown
-                        base_filename=Path(result.source).stem
-                    )
-                    
-                    results.append({
-                        "source": result.source,
-                        "success": True,
-                        "markdown_path": save_result.get("output_path"),
-                        "content_length": doc_result.get("content_length"),
-                        "processing_time": result.processing_time
-                    })
-                else:
-                    results.append({
-                        "source": result.source,
-                        "success": False,
-                        "error": doc_result.get("error"),
-                        "processing_time": result.processing_time
-                    })
-            else:
-                results.append({
-                    "source": result.source,
-                    "success": False,
-                    "error": result.error,
-                    "processing_time": result.processing_time
-                })
+        # Step 5: Prepare results, saving the markdown outputs from a single writer thread
+        results = await collect_results(batch_result, processor)
         
         # Step 6: Return comprehensive results
         return {
@@ -169,22 +158,9 @@ class ProcessFolderPipeline(BaseTool):
             "annotate_images": self.annotate_images,
             "save_images_as_files": self.save_images_as_files,
             "max_concurrent": self.max_concurrent,
-            "results": results,
+            "results": [without_none(doc_result) for doc_result in results],
             "message": f"Processed {batch_result.successful_documents}/{batch_result.total_documents} documents successfully"
         }
-    
-    async def _process_single_document(self, document) -> Dict[str, Any]:
-        """Process a single document"""
-        processor = DoclingProcessor(
-            annotate_images=self.annotate_images,
-            images_scale=self.images_scale,
-            save_images_as_files=self.save_images_as_files
-        )
-        
-        return await processor.convert_document(
-            input_source=document.source,
-            input_type=document.source_type
-        )
 
 
 if __name__ == "__main__":
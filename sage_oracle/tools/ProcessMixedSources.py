@@ -4,19 +4,24 @@ Process documents from multiple sources (folders, URLs, sitemaps) in a single op
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Optional
+from functools import partial
 import asyncio
 from pathlib import Path
 
-# Import our shared utilities
+# Import our shared utilities; the tools folder is added to the import path once
 import sys
-from pathlib import Path
-sys.path.append(str(Path(__file__).parent))
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps as _dumps, without_none
 from utils.docling_processor import DoclingProcessor
+from utils.processor_pool import process_one, collect_results
+from utils.input_sources.base_input_source import dedupe_documents
 from utils.input_sources.folder_input_source import FolderInputSource
 from utils.input_sources.url_input_source import URLInputSource
 from utils.concurrency.batch_processor import BatchProcessor
+from utils.event_loop import run_coroutine
 
 class ProcessMixedSources(BaseTool):
     """
@@ -49,6 +54,11 @@ class ProcessMixedSources(BaseTool):
         description="Number of concurrent pipelines (1-50)"
     )
     
+    per_host_max: Optional[int] = Field(
+        default=None,
+        description="Maximum number of concurrent documents fetched from any one host; None leaves max_concurrent as the only limit"
+    )
+    
     output_format: str = Field(
         default="markdown",
         description="Output format preference (markdown, json, html)"
@@ -76,26 +86,32 @@ class ProcessMixedSources(BaseTool):
         try:
             # Step 1: Validate inputs
             if not any([self.folder_paths, self.urls, self.sitemap_urls]):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "At least one input source must be provided (folder_paths, urls, or sitemap_urls)"
-                }, indent=2)
+                })
             
             if not (1 <= self.max_concurrent <= 50):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "max_concurrent must be between 1 and 50"
-                }, indent=2)
+                })
+            
+            if self.per_host_max is not None and self.per_host_max < 1:
+                return _dumps({
+                    "success": False,
+                    "error": "per_host_max must be at least 1"
+                })
             
             # Step 2: Run async processing
-            result = asyncio.run(self._process_mixed_sources_async())
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            result = run_coroutine(self._process_mixed_sources_async())
+            return _dumps(result)
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
     
     async def _process_mixed_sources_async(self) -> Dict[str, Any]:
         """Asynchronous mixed-source processing implementation"""
@@ -107,29 +123,37 @@ class ProcessMixedSources(BaseTool):
             "sitemaps": []
         }
         
-        # Step 1: Process folder sources
-        for folder_path in self.folder_paths:
-            try:
-                input_source = FolderInputSource(
-                    folder_path=folder_path,
-                    file_patterns=self.file_patterns
-                )
-                documents = await input_source.get_documents()
-                all_documents.extend(documents)
-                
-                source_info["folders"].append({
-                    "path": folder_path,
-                    "document_count": len(documents),
-                    "patterns": self.file_patterns
-                })
-            except Exception as e:
+        # Step 1: Enumerate folder and sitemap sources concurrently
+        folder_sources = [
+            FolderInputSource(folder_path=folder_path, file_patterns=self.file_patterns)
+            for folder_path in self.folder_paths
+        ]
+        sitemap_sources = [URLInputSource(sitemap_url=sitemap_url) for sitemap_url in self.sitemap_urls]
+        outcomes = await asyncio.gather(
+            *(input_source.get_documents() for input_source in folder_sources + sitemap_sources),
+            return_exceptions=True
+        )
+        folder_outcomes = outcomes[:len(folder_sources)]
+        sitemap_outcomes = outcomes[len(folder_sources):]
+        
+        # Step 2: Collect folder sources
+        for folder_path, documents in zip(self.folder_paths, folder_outcomes):
+            if isinstance(documents, Exception):
                 source_info["folders"].append({
                     "path": folder_path,
-                    "error": str(e),
+                    "error": str(documents),
                     "document_count": 0
                 })
+                continue
+            
+            all_documents.extend(documents)
+            source_info["folders"].append({
+                "path": folder_path,
+                "document_count": len(documents),
+                "patterns": self.file_patterns
+            })
         
-        # Step 2: Process URL sources
+        # Step 3: Process URL sources
         if self.urls:
             try:
                 input_source = URLInputSource(urls=self.urls)
@@ -147,23 +171,24 @@ class ProcessMixedSources(BaseTool):
                     "document_count": 0
                 })
         
-        # Step 3: Process sitemap sources
-        for sitemap_url in self.sitemap_urls:
-            try:
-                input_source = URLInputSource(sitemap_url=sitemap_url)
-                documents = await input_source.get_documents()
-                all_documents.extend(documents)
-                
+        # Step 4: Collect sitemap sources
+        for sitemap_url, documents in zip(self.sitemap_urls, sitemap_outcomes):
+            if isinstance(documents, Exception):
                 source_info["sitemaps"].append({
                     "url": sitemap_url,
-                    "document_count": len(documents)
-                })
-            except Exception as e:
-                source_info["sitemaps"].append({
-                    "url": sitemap_url,
-                    "error": str(e),
+                    "error": str(documents),
                     "document_count": 0
                 })
+                continue
+            
+            all_documents.extend(documents)
+            source_info["sitemaps"].append({
+                "url": sitemap_url,
+                "document_count": len(documents)
+            })
+        
+        # Overlapping folders, repeated URLs and sitemap aliases would otherwise be processed twice
+        all_documents, source_info["duplicates_removed"] = dedupe_documents(all_documents)
         
         if not all_documents:
             return {
@@ -172,7 +197,7 @@ class ProcessMixedSources(BaseTool):
                 "source_info": source_info
             }
         
-        # Step 4: Create processor and batch processor
+        # Step 5: Create processor and batch processor
         processor = DoclingProcessor(
             annotate_images=self.annotate_images,
             images_scale=self.images_scale,
@@ -180,52 +205,24 @@ class ProcessMixedSources(BaseTool):
             max_workers=self.max_concurrent
         )
         
-        batch_processor = BatchProcessor(max_concurrent=self.max_concurrent)
+        batch_processor = BatchProcessor(max_concurrent=self.max_concurrent, per_host_max=self.per_host_max)
         
-        # Step 5: Process all documents
+        # Step 6: Process all documents
         batch_result = await batch_processor.process_documents(
             documents=all_documents,
-            processor_func=self._process_single_document,
+            processor_func=partial(
+                process_one,
+                annotate_images=self.annotate_images,
+                images_scale=self.images_scale,
+                save_images_as_files=self.save_images_as_files
+            ),
             batch_id="mixed_sources"
         )
         
-        # Step 6: Prepare results
-        results = []
-        for result in batch_result.results:
-            if result.success:
-                # Save the markdown output
-                doc_result = result.result
-                if doc_result.get("success"):
-                    save_result = processor.save_markdown(
-                        document=doc_result["document"],
-                        output_path="",  # Will be determined by save_markdown
-                        base_filename=self._get_base_filename(result.source)
-                    )
-                    
-                    results.append({
-                        "source": result.source,
-                        "source_type": doc_result.get("input_type", "unknown"),
-                        "success": True,
-                        "markdown_path": save_result.get("output_path"),
-                        "content_length": doc_result.get("content_length"),
-                        "processing_time": result.processing_time
-                    })
-                else:
-                    results.append({
-                        "source": result.source,
-                        "success": False,
-                        "error": doc_result.get("error"),
-                        "processing_time": result.processing_time
-                    })
-            else:
-                results.append({
-                    "source": result.source,
-                    "success": False,
-                    "error": result.error,
-                    "processing_time": result.processing_time
-                })
+        # Step 7: Prepare results, saving the markdown outputs from a single writer thread
+        results = await collect_results(batch_result, processor, include_source_type=True)
         
-        # Step 7: Return comprehensive results
+        # Step 8: Return comprehensive results
         return {
             "success": True,
             "source_info": source_info,
@@ -237,49 +234,11 @@ class ProcessMixedSources(BaseTool):
             "annotate_images": self.annotate_images,
             "save_images_as_files": self.save_images_as_files,
             "max_concurrent": self.max_concurrent,
-            "results": results,
+            "per_host_max": self.per_host_max,
+            "results": [without_none(doc_result) for doc_result in results],
             "message": f"Processed {batch_result.successful_documents}/{batch_result.total_documents} documents from mixed sources successfully"
         }
-    
-    async def _process_single_document(self, document) -> Dict[str, Any]:
-        """Process a single document"""
-        processor = DoclingProcessor(
-            annotate_images=self.annotate_images,
-            images_scale=self.images_scale,
-            save_images_as_files=self.save_images_as_files
-        )
-        
-        return await processor.convert_document(
-            input_source=document.source,
-            input_type=document.source_type
-        )
-    
-    def _get_base_filename(self, source: str) -> str:
-        """Get a base filename from a source path or URL"""
-        from urllib.parse import urlparse
-        import re
-        
-        # If it's a file path
-        if source.startswith('/') or '\\' in source or Path(source).exists():
-            return Path(source).stem
-        
-        # If it's a URL
-        if source.startswith(('http://', 'https://')):
-            parsed = urlparse(source)
-            path = parsed.path
-            
-            if path:
-                filename = path.split('/')[-1]
-                if filename:
-                    filename = filename.split('.')[0]
-                    return re.sub(r'[^a-zA-Z0-9_-]', '_', filename)
-            
-            # Fallback to domain name
-            domain = parsed.netloc.replace('www.', '')
-            return re.sub(r'[^a-zA-Z0-9_-]', '_', domain)
-        
-        # Fallback
-        return re.sub(r'[^a-zA-Z0-9_-]', '_', source)
+
 
 
 if __name__ == "__main__":
@@ -4,18 +4,23 @@ Process all documents from a website sitemap with full pipeline execution.
 
 from agency_swarm.tools import BaseTool
 from pydantic import Field
-from typing import List, Dict, Any
-import json
-import asyncio
+from typing import List, Dict, Any, Optional
+from functools import partial
 from urllib.parse import urlparse
 
-# Import our shared utilities
+# Import our shared utilities; the tools folder is added to the import path once
 import sys
 from pathlib import Path
-sys.path.append(str(Path(__file__).parent))
+_TOOLS_DIR = str(Path(__file__).parent)
+if _TOOLS_DIR not in sys.path:
+    sys.path.append(_TOOLS_DIR)
+from utils.serialization import dumps as _dumps, without_none
 from utils.docling_processor import DoclingProcessor
+from utils.processor_pool import process_one, collect_results
+from utils.input_sources.base_input_source import dedupe_documents
 from utils.input_sources.url_input_source import URLInputSource
 from utils.concurrency.batch_processor import BatchProcessor
+from utils.event_loop import run_coroutine
 
 class ProcessSitemapPipeline(BaseTool):
     """
@@ -33,6 +38,11 @@ class ProcessSitemapPipeline(BaseTool):
         description="Number of concurrent pipelines (1-20 for web processing)"
     )
     
+    per_host_max: Optional[int] = Field(
+        default=None,
+        description="Maximum number of concurrent documents fetched from any one host; None leaves max_concurrent as the only limit"
+    )
+    
     enable_chunking: bool = Field(
         default=True,
         description="Enable document chunking for optimal retrieval"
@@ -70,26 +80,32 @@ class ProcessSitemapPipeline(BaseTool):
         try:
             # Step 1: Validate inputs
             if not self.sitemap_url.startswith(('http://', 'https://')):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": f"Invalid sitemap URL: {self.sitemap_url}"
-                }, indent=2)
+                })
             
             if not (1 <= self.max_concurrent <= 20):
-                return json.dumps({
+                return _dumps({
                     "success": False,
                     "error": "max_concurrent must be between 1 and 20 for web processing"
-                }, indent=2)
+                })
+            
+            if self.per_host_max is not None and self.per_host_max < 1:
+                return _dumps({
+                    "success": False,
+                    "error": "per_host_max must be at least 1"
+                })
             
             # Step 2: Run async processing
-            result = asyncio.run(self._process_sitemap_async())
-            return json.dumps(result, indent=2, ensure_ascii=False)
+            result = run_coroutine(self._process_sitemap_async())
+            return _dumps(result)
             
         except Exception as e:
-            return json.dumps({
+            return _dumps({
                 "success": False,
                 "error": f"Unexpected error: {str(e)}"
-            }, indent=2)
+            })
     
     async def _process_sitemap_async(self) -> Dict[str, Any]:
         """Asynchronous sitemap processing implementation"""
@@ -97,8 +113,8 @@ class ProcessSitemapPipeline(BaseTool):
         # Step 1: Create input source
         input_source = URLInputSource(sitemap_url=self.sitemap_url)
         
-        # Step 2: Get documents to process
-        documents = await input_source.get_documents()
+        # Step 2: Get documents to process, reading no further into the sitemap than max_urls
+        documents = await input_source.get_documents(limit=self.max_urls or None)
         
         if not documents:
             return {
@@ -106,9 +122,8 @@ class ProcessSitemapPipeline(BaseTool):
                 "error": f"No URLs found in sitemap: {self.sitemap_url}"
             }
         
-        # Step 3: Limit URLs if specified
-        if self.max_urls and len(documents) > self.max_urls:
-            documents = documents[:self.max_urls]
+        # Step 3: Drop duplicate URLs
+        documents, duplicates_removed = dedupe_documents(documents)
         
         # Step 4: Create processor and batch processor
         processor = DoclingProcessor(
@@ -118,55 +133,30 @@ class ProcessSitemapPipeline(BaseTool):
             max_workers=self.max_concurrent
         )
         
-        batch_processor = BatchProcessor(max_concurrent=self.max_concurrent)
+        # Sitemap URLs usually share one host, so per_host_max caps the whole run when set
+        batch_processor = BatchProcessor(max_concurrent=self.max_concurrent, per_host_max=self.per_host_max)
         
         # Step 5: Process documents
         batch_result = await batch_processor.process_documents(
             documents=documents,
-            processor_func=self._process_single_document,
+            processor_func=partial(
+                process_one,
+                annotate_images=self.annotate_images,
+                images_scale=self.images_scale,
+                save_images_as_files=self.save_images_as_files
+            ),
             batch_id=f"sitemap_{urlparse(self.sitemap_url).netloc}"
         )
         
-        # Step 6: Prepare results
-        results = []
-        for result in batch_result.results:
-            if result.success:
-                # Save the markdown output
-                doc_result = result.result
-                if doc_result.get("success"):
-                    save_result = processor.save_markdown(
-                        document=doc_result["document"],
-                        output_path="",  # Will be determined by save_markdown
-                        base_filename=self._get_filename_from_url(result.source)
-                    )
-                    
-                    results.append({
-                        "source": result.source,
-                        "success": True,
-                        "markdown_path": save_result.get("output_path"),
-                        "content_length": doc_result.get("content_length"),
-                        "processing_time": result.processing_time
-                    })
-                else:
-                    results.append({
-                        "source": result.source,
-                        "success": False,
-                        "error": doc_result.get("error"),
-                        "processing_time": result.processing_time
-                    })
-            else:
-                results.append({
-                    "source": result.source,
-                    "success": False,
-                    "error": result.error,
-                    "processing_time": result.processing_time
-                })
+        # Step 6: Prepare results, saving the markdown outputs from a single writer thread
+        results = await collect_results(batch_result, processor)
         
         # Step 7: Return comprehensive results
         return {
             "success": True,
             "sitemap_url": self.sitemap_url,
             "total_documents": batch_result.total_documents,
+            "duplicates_removed": duplicates_removed,
             "successful_documents": batch_result.successful_documents,
             "failed_documents": batch_result.failed_documents,
             "total_processing_time": batch_result.processing_time,
@@ -175,44 +165,10 @@ class ProcessSitemapPipeline(BaseTool):
             "annotate_images": self.annotate_images,
             "save_images_as_files": self.save_images_as_files,
             "max_concurrent": self.max_concurrent,
-            "results": results,
+            "per_host_max": self.per_host_max,
+            "results": [without_none(doc_result) for doc_result in results],
             "message": f"Processed {batch_result.successful_documents}/{batch_result.total_documents} documents from sitemap successfully"
         }
-    
-    async def _process_single_document(self, document) -> Dict[str, Any]:
-        """Process a single document"""
-        processor = DoclingProcessor(
-            annotate_images=self.annotate_images,
-            images_scale=self.images_scale,
-            save_images_as_files=self.save_images_as_files
-        )
-        
-        return await processor.convert_document(
-            input_source=document.source,
-            input_type=document.source_type
-        )
-    
-    def _get_filename_from_url(self, url: str) -> str:
-        """Extract a filename from a URL"""
-        from urllib.parse import urlparse
-        import re
-        
-        parsed = urlparse(url)
-        path = parsed.path
-        
-        # Remove leading slash and get the last part
-        if path:
-            filename = path.split('/')[-1]
-            if filename:
-                # Remove file extension and clean up
-                filename = filename.split('.')[0]
-                # Remove non-alphanumeric characters
-                filename = re.sub(r'[^a-zA-Z0-9_-]', '_', filename)
-                return filename
-        
-        # Fallback to domain name
-        domain = parsed.netloc.replace('www.', '')
-        return re.sub(r'[^a-zA-Z0-9_-]', '_', domain)
 
 
 if __name__ == "__main__":
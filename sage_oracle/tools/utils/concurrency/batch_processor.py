@@ -3,12 +3,31 @@ Batch processing with concurrency management for Sage Oracle Agent.
 """
 
 import asyncio
+import itertools
+import time
 import uuid
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, AsyncIterable, Union
+from datetime import datetime, timedelta
+from collections import deque
 from dataclasses import dataclass, field
+from contextlib import asynccontextmanager, AsyncExitStack
+from ..filenames import split_url
+from ..docling_processor import backoff_delay
 
-@dataclass
+# How many recent operations active_operations keeps for status queries
+_MAX_TRACKED_OPERATIONS = 100
+
+# Lists at least this many times max_concurrent long are processed by a worker pool
+_WORKER_POOL_FACTOR = 4
+
+
+def _batch_size(processor_func) -> int:
+    """How many documents processor_func takes per call: its batch_size attribute, or 1"""
+    # functools.partial objects keep the wrapped function's attributes on .func
+    func = getattr(processor_func, "func", processor_func)
+    return getattr(processor_func, "batch_size", None) or getattr(func, "batch_size", 1)
+
+@dataclass(slots=True)
 class ProcessingResult:
     """Result of a document processing operation"""
     operation_id: str
@@ -18,8 +37,9 @@ class ProcessingResult:
     error: str = None
     processing_time: float = 0.0
     timestamp: datetime = field(default_factory=datetime.now)
+    document: Any = None
 
-@dataclass
+@dataclass(slots=True)
 class BatchResult:
     """Result of a batch processing operation"""
     batch_id: str
@@ -30,31 +50,115 @@ class BatchResult:
     results: List[ProcessingResult] = field(default_factory=list)
     timestamp: datetime = field(default_factory=datetime.now)
 
+@dataclass(slots=True)
+class PipelineDocResult:
+    """Per-document entry in a pipeline tool's results; None fields are left out of the output"""
+    source: str
+    success: bool
+    processing_time: float
+    markdown_path: Optional[str] = None
+    content_length: Optional[int] = None
+    error: Optional[str] = None
+    source_type: Optional[str] = None
+
 class BatchProcessor:
     """Manages concurrent document processing with controlled concurrency"""
     
-    def __init__(self, max_concurrent: int = 10):
+    def __init__(self, max_concurrent: int = 10, per_host_max: Optional[int] = 4,
+                 max_retries: int = 0,
+                 retry_callback: Optional[Callable[[str, int, Exception], None]] = None):
         """
         Initialize batch processor.
         
         Args:
             max_concurrent: Maximum number of concurrent processing operations
+            per_host_max: Maximum number of concurrent operations on URL documents
+                from the same host, or None for no per-host limit
+            max_retries: How many times a document whose processor_func raised is
+                retried, after a jittered exponential backoff
+            retry_callback: Optional callable invoked before each retry with
+                (source, attempt, error)
         """
         self.max_concurrent = max_concurrent
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.per_host_max = per_host_max
+        self.max_retries = max_retries
+        self.retry_callback = retry_callback
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        # Slots are counted explicitly so max_concurrent can change mid-batch
+        self._active = 0
+        self._slot_available = asyncio.Condition()
         self.active_operations: Dict[str, Dict[str, Any]] = {}
+        # Operation ids in start order, so the oldest can be evicted without sorting
+        self._operation_order = deque()
+        # Operation ids only need to be unique within this processor
+        self._operation_counter = itertools.count()
+        # Status totals over active_operations, kept in step as operations change
+        self._status_counts = {"processing": 0, "completed": 0, "failed": 0}
+    
+    async def set_max_concurrent(self, max_concurrent: int) -> None:
+        """
+        Change how many documents may be processed at once, e.g. to back off on rate limits.
+        
+        Operations already running are not interrupted; lowering the limit only
+        delays new ones until enough have finished. Streamed batches keep the
+        worker count they started with, so raising the limit does not add workers.
+        """
+        async with self._slot_available:
+            self.max_concurrent = max_concurrent
+            self._slot_available.notify_all()
+    
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of the max_concurrent processing slots"""
+        async with self._slot_available:
+            await self._slot_available.wait_for(lambda: self._active < self.max_concurrent)
+            self._active += 1
+        try:
+            yield
+        finally:
+            async with self._slot_available:
+                self._active -= 1
+                self._slot_available.notify(1)
+    
+    @asynccontextmanager
+    async def _host_slots(self, documents: List[Any]):
+        """Hold one per-host slot for each host among a group's URL documents; other documents pass straight through"""
+        if self.per_host_max is None:
+            yield
+            return
+        
+        hosts = sorted({
+            split_url(document.source)[1].lower()
+            for document in documents
+            if getattr(document, "source_type", None) == "url"
+        })
+        async with AsyncExitStack() as stack:
+            # Hosts are taken in sorted order, so groups sharing hosts cannot deadlock
+            for host in hosts:
+                limit = self._host_limits.get(host)
+                if limit is None:
+                    limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_max)
+                await stack.enter_async_context(limit)
+            yield
     
     async def process_documents(self, 
-                              documents: List[Any], 
+                              documents: Union[List[Any], AsyncIterable[Any]], 
                               processor_func,
-                              batch_id: str = None) -> BatchResult:
+                              batch_id: str = None,
+                              progress_callback: Optional[Callable[[int, Optional[int], ProcessingResult], None]] = None) -> BatchResult:
         """
         Process multiple documents with controlled concurrency.
         
         Args:
-            documents: List of documents to process
-            processor_func: Function to process each document
+            documents: List of documents to process, or an async iterable that
+                yields them as they are discovered
+            processor_func: Function to process each document. When it declares a
+                batch_size attribute above 1, it is instead called with lists of up to
+                that many documents and returns one result per document, in order
             batch_id: Optional batch identifier
+            progress_callback: Optional callable invoked as each document finishes,
+                with (completed_count, total_count, result); total_count is None
+                for streamed documents
             
         Returns:
             BatchResult with processing statistics
@@ -62,32 +166,20 @@ class BatchProcessor:
         if batch_id is None:
             batch_id = str(uuid.uuid4())
         
-        start_time = datetime.now()
-        results = []
+        if hasattr(documents, "__aiter__"):
+            return await self._process_stream(documents, processor_func, batch_id, progress_callback)
         
-        # Create tasks for concurrent processing
-        tasks = []
-        for doc in documents:
-            task = self._process_with_semaphore(doc, processor_func, batch_id)
-            tasks.append(task)
-        
-        # Wait for all tasks to complete
-        task_results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # Process results
-        for i, result in enumerate(task_results):
-            if isinstance(result, Exception):
-                results.append(ProcessingResult(
-                    operation_id=f"{batch_id}_{i}",
-                    source=str(documents[i]) if i < len(documents) else "unknown",
-                    success=False,
-                    error=str(result)
-                ))
-            else:
-                results.append(result)
-        
-        end_time = datetime.now()
-        processing_time = (end_time - start_time).total_seconds()
+        start_time = time.perf_counter()
+        
+        # Short lists get one task per document; longer ones, and batch-aware
+        # processor functions, share a fixed pool of workers so only max_concurrent
+        # coroutines exist however long the list is
+        if _batch_size(processor_func) == 1 and len(documents) < self.max_concurrent * _WORKER_POOL_FACTOR:
+            results = await self._process_with_tasks(documents, processor_func, batch_id, progress_callback)
+        else:
+            results = await self._process_with_workers(documents, processor_func, batch_id, progress_callback)
+        
+        processing_time = time.perf_counter() - start_time
         
         # Calculate statistics
         successful = sum(1 for r in results if r.success)
@@ -102,70 +194,258 @@ class BatchProcessor:
             results=results
         )
     
+    async def _process_with_tasks(self,
+                                  documents: List[Any],
+                                  processor_func,
+                                  batch_id: str,
+                                  progress_callback: Optional[Callable[[int, Optional[int], ProcessingResult], None]] = None) -> List[ProcessingResult]:
+        """Process a list of documents with one task each, returning results in input order"""
+        # Create tasks for concurrent processing
+        if progress_callback is None:
+            coroutines = [
+                self._process_with_semaphore(doc, processor_func, batch_id)
+                for doc in documents
+            ]
+        else:
+            total = len(documents)
+            completed = 0
+            
+            async def process_and_report(doc):
+                nonlocal completed
+                result = await self._process_with_semaphore(doc, processor_func, batch_id)
+                completed += 1
+                progress_callback(completed, total, result)
+                return result
+            
+            coroutines = [process_and_report(doc) for doc in documents]
+        
+        # Wait for all tasks to complete; _process_with_semaphore turns processing
+        # errors into failed results, so one document never cancels its siblings
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(coroutine) for coroutine in coroutines]
+        return [task.result() for task in tasks]
+    
+    async def _process_with_workers(self,
+                                    documents: List[Any],
+                                    processor_func,
+                                    batch_id: str,
+                                    progress_callback: Optional[Callable[[int, Optional[int], ProcessingResult], None]] = None) -> List[ProcessingResult]:
+        """Process a list of documents with max_concurrent workers, returning results in input order"""
+        total = len(documents)
+        results = [None] * total
+        completed = 0
+        batch_size = _batch_size(processor_func)
+        # Shared by every worker, so each document is taken exactly once
+        pending = iter(enumerate(documents))
+        
+        async def worker():
+            nonlocal completed
+            while group := list(itertools.islice(pending, batch_size)):
+                group_results = await self._process_group(
+                    [document for _, document in group], processor_func, batch_id, batched=batch_size > 1
+                )
+                for (i, _), result in zip(group, group_results):
+                    results[i] = result
+                    completed += 1
+                    if progress_callback is not None:
+                        progress_callback(completed, total, result)
+        
+        async with asyncio.TaskGroup() as task_group:
+            for _ in range(self.max_concurrent):
+                task_group.create_task(worker())
+        return results
+    
+    async def _process_stream(self,
+                              documents: AsyncIterable[Any],
+                              processor_func,
+                              batch_id: str,
+                              progress_callback: Optional[Callable[[int, Optional[int], ProcessingResult], None]] = None) -> BatchResult:
+        """
+        Process documents from an async iterable with a fixed pool of workers.
+        
+        Documents are fed through a bounded queue, so at most a few batches'
+        worth are held in memory however many the source yields. A batch-aware
+        processor function gets whatever is already queued, up to its batch_size,
+        without waiting for more to arrive.
+        """
+        start_time = time.perf_counter()
+        results = []
+        queue = asyncio.Queue(maxsize=self.max_concurrent * 2)
+        done = object()
+        batch_size = _batch_size(processor_func)
+        
+        async def worker():
+            finished = False
+            while not finished:
+                document = await queue.get()
+                if document is done:
+                    return
+                group = [document]
+                while len(group) < batch_size and not queue.empty():
+                    document = queue.get_nowait()
+                    if document is done:
+                        finished = True
+                        break
+                    group.append(document)
+                
+                for result in await self._process_group(group, processor_func, batch_id, batched=batch_size > 1):
+                    results.append(result)
+                    if progress_callback is not None:
+                        progress_callback(len(results), None, result)
+        
+        async def feed():
+            try:
+                async for document in documents:
+                    await queue.put(document)
+            finally:
+                # Let the workers drain the queue and stop, even if the source failed
+                for _ in range(self.max_concurrent):
+                    await queue.put(done)
+        
+        tasks = [asyncio.create_task(feed())]
+        tasks.extend(asyncio.create_task(worker()) for _ in range(self.max_concurrent))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        processing_time = time.perf_counter() - start_time
+        successful = sum(1 for r in results if r.success)
+        
+        return BatchResult(
+            batch_id=batch_id,
+            total_documents=len(results),
+            successful_documents=successful,
+            failed_documents=len(results) - successful,
+            processing_time=processing_time,
+            results=results
+        )
+    
     async def _process_with_semaphore(self, 
                                     document: Any, 
                                     processor_func,
                                     batch_id: str) -> ProcessingResult:
-        """Process a single document with semaphore control"""
-        operation_id = f"{batch_id}_{uuid.uuid4().hex[:8]}"
+        """Process a single document once a concurrency slot is free"""
+        return (await self._process_group([document], processor_func, batch_id, batched=False))[0]
+    
+    async def _process_group(self,
+                             documents: List[Any],
+                             processor_func,
+                             batch_id: str,
+                             batched: bool) -> List[ProcessingResult]:
+        """
+        Process documents with one processor_func call once a concurrency slot is free,
+        retrying failures after a backoff.
         
-        async with self.semaphore:
-            start_time = datetime.now()
-            
-            try:
-                # Track active operation
-                self.active_operations[operation_id] = {
-                    "start_time": start_time,
-                    "document": str(document),
-                    "status": "processing"
-                }
-                
-                # Process the document
-                result = await processor_func(document)
-                
-                end_time = datetime.now()
-                processing_time = (end_time - start_time).total_seconds()
-                
-                # Update operation status
-                self.active_operations[operation_id]["status"] = "completed"
-                self.active_operations[operation_id]["end_time"] = end_time
-                
-                return ProcessingResult(
-                    operation_id=operation_id,
-                    source=str(document),
-                    success=True,
-                    result=result,
-                    processing_time=processing_time
-                )
-                
-            except Exception as e:
-                end_time = datetime.now()
-                processing_time = (end_time - start_time).total_seconds()
+        A batched processor_func is called with the whole list and returns one result
+        per document; otherwise the group is a single document, passed on its own.
+        """
+        operation_ids = [f"{batch_id}_{next(self._operation_counter):08x}" for _ in documents]
+        # DocumentInput objects report their source rather than their repr
+        sources = [str(getattr(document, "source", document)) for document in documents]
+        operations = None
+        attempt = 0
+        
+        while True:
+            # The host slots are taken first, so a group waiting on a host does not
+            # hold one of the max_concurrent slots
+            async with self._host_slots(documents), self._slot():
+                if operations is None:
+                    # Durations come from perf_counter; the wall clock is read once, for the
+                    # reported start time, and the end time is derived from it
+                    start_time = datetime.now()
+                    start = time.perf_counter()
+                    
+                    # Track active operations; they may be evicted while running, so keep references
+                    operations = [
+                        {"start_time": start_time, "document": source, "status": "processing"}
+                        for source in sources
+                    ]
+                    for operation_id, operation in zip(operation_ids, operations):
+                        self._track_operation(operation_id, operation)
                 
-                # Update operation status
-                self.active_operations[operation_id]["status"] = "failed"
-                self.active_operations[operation_id]["end_time"] = end_time
-                self.active_operations[operation_id]["error"] = str(e)
+                try:
+                    # Process the documents
+                    if batched:
+                        results = await processor_func(documents)
+                        if len(results) != len(documents):
+                            raise ValueError(f"processor_func returned {len(results)} results for {len(documents)} documents")
+                    else:
+                        results = [await processor_func(documents[0])]
+                    
+                    return self._finish_group(operation_ids, operations, documents, sources,
+                                              start_time, start, results=results)
+                    
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        return self._finish_group(operation_ids, operations, documents, sources,
+                                                  start_time, start, error=str(e))
+                    error = e
                 
-                return ProcessingResult(
-                    operation_id=operation_id,
-                    source=str(document),
-                    success=False,
-                    error=str(e),
-                    processing_time=processing_time
-                )
+                finally:
+                    self._evict_old_operations()
             
-            finally:
-                # Clean up completed operations (keep last 100)
-                if len(self.active_operations) > 100:
-                    # Remove oldest operations
-                    oldest_ops = sorted(
-                        self.active_operations.items(),
-                        key=lambda x: x[1].get("start_time", datetime.min)
-                    )[:len(self.active_operations) - 100]
-                    
-                    for op_id, _ in oldest_ops:
-                        del self.active_operations[op_id]
+            # Back off with every slot released, so other documents use them meanwhile
+            attempt += 1
+            if self.retry_callback is not None:
+                for source in sources:
+                    self.retry_callback(source, attempt, error)
+            await asyncio.sleep(backoff_delay(attempt - 1))
+    
+    def _finish_group(self,
+                      operation_ids: List[str],
+                      operations: List[Dict[str, Any]],
+                      documents: List[Any],
+                      sources: List[str],
+                      start_time: datetime,
+                      start: float,
+                      results: Optional[List[Any]] = None,
+                      error: Optional[str] = None) -> List[ProcessingResult]:
+        """Mark a group's operations completed, or failed when error is set, and build their results"""
+        processing_time = time.perf_counter() - start
+        end_time = start_time + timedelta(seconds=processing_time)
+        status = "completed" if error is None else "failed"
+        
+        group_results = []
+        for i, (operation_id, operation) in enumerate(zip(operation_ids, operations)):
+            # Update operation status
+            self._set_status(operation_id, operation, status)
+            operation["end_time"] = end_time
+            if error is not None:
+                operation["error"] = error
+            
+            group_results.append(ProcessingResult(
+                operation_id=operation_id,
+                source=sources[i],
+                success=error is None,
+                result=results[i] if results is not None else None,
+                error=error,
+                processing_time=processing_time,
+                timestamp=end_time,
+                document=documents[i]
+            ))
+        return group_results
+    
+    def _track_operation(self, operation_id: str, operation: Dict[str, Any]) -> None:
+        """Start tracking a newly started operation"""
+        self.active_operations[operation_id] = operation
+        self._operation_order.append(operation_id)
+        self._status_counts["processing"] += 1
+    
+    def _set_status(self, operation_id: str, operation: Dict[str, Any], status: str) -> None:
+        """Move an operation to a new status, updating the counts if it is still tracked"""
+        if self.active_operations.get(operation_id) is operation:
+            self._status_counts[operation["status"]] -= 1
+            self._status_counts[status] += 1
+        operation["status"] = status
+    
+    def _evict_old_operations(self) -> None:
+        """Clean up completed operations (keep last 100), oldest first"""
+        while len(self.active_operations) > _MAX_TRACKED_OPERATIONS:
+            evicted = self.active_operations.pop(self._operation_order.popleft(), None)
+            if evicted is not None:
+                self._status_counts[evicted["status"]] -= 1
     
     def get_active_operations(self) -> Dict[str, Dict[str, Any]]:
         """Get currently active operations"""
@@ -178,12 +458,9 @@ class BatchProcessor:
     def get_processing_stats(self) -> Dict[str, Any]:
         """Get overall processing statistics"""
         active_count = len(self.active_operations)
-        completed_count = sum(1 for op in self.active_operations.values() 
-                            if op.get("status") == "completed")
-        failed_count = sum(1 for op in self.active_operations.values() 
-                         if op.get("status") == "failed")
-        processing_count = sum(1 for op in self.active_operations.values() 
-                             if op.get("status") == "processing")
+        completed_count = self._status_counts["completed"]
+        failed_count = self._status_counts["failed"]
+        processing_count = self._status_counts["processing"]
         
         return {
             "max_concurrent": self.max_concurrent,
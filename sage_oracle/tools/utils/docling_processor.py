@@ -4,16 +4,215 @@ Handles document conversion, chunking, and embedding operations.
 """
 
 import os
+import re
 import json
+import random
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+# Long strings made only of base64 characters are taken as base64 content without a
+# filesystem check; shorter ones could be relative paths, so those are still stat'ed
+_BASE64_RE = re.compile(r'[A-Za-z0-9+/]+={0,2}')
+_BASE64_MIN_LENGTH = 256
+
+
+def looks_like_base64(input_source: str) -> bool:
+    """Whether a source is plainly base64 content rather than a path"""
+    return len(input_source) >= _BASE64_MIN_LENGTH and _BASE64_RE.fullmatch(input_source) is not None
+
+
+def _detect_input_type(input_source: str) -> str:
+    """Classify a source as url, base64 or file, calling os.path.exists only when the string is ambiguous"""
+    if input_source.startswith(("http://", "https://")):
+        return "url"
+    if looks_like_base64(input_source):
+        return "base64"
+    return "file" if os.path.exists(input_source) else "base64"
+
+
+def _count_characters(path, chunk_size: int = 1 << 20) -> int:
+    """Count the characters in a UTF-8 text file, holding one chunk in memory at a time"""
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(len(chunk) for chunk in iter(lambda: f.read(chunk_size), ""))
+
+
+# Docling classes, imported on the first conversion; loading Docling is slow, so it is
+# kept out of module import but done only once
+_DOCLING_CLASSES = None
+
+
+def _load_docling() -> tuple:
+    """Import Docling once and return the classes used to build converters"""
+    global _DOCLING_CLASSES
+    if _DOCLING_CLASSES is None:
+        from docling.document_converter import DocumentConverter, PdfFormatOption
+        from docling.datamodel.base_models import InputFormat
+        from docling.datamodel.pipeline_options import PdfPipelineOptions, PictureDescriptionApiOptions
+        _DOCLING_CLASSES = (DocumentConverter, PdfFormatOption, InputFormat, PdfPipelineOptions, PictureDescriptionApiOptions)
+    return _DOCLING_CLASSES
+
+
+def _build_converter(annotate_images: bool, images_scale: int = None, image_model: str = None, api_key: str = None):
+    """Build a DocumentConverter, with OpenAI picture description when annotate_images is set"""
+    DocumentConverter, PdfFormatOption, InputFormat, PdfPipelineOptions, PictureDescriptionApiOptions = _load_docling()
+    
+    if not annotate_images:
+        # Standard converter without image annotation
+        return DocumentConverter()
+    
+    # Configure picture description options
+    picture_desc_api_option = PictureDescriptionApiOptions(
+        url="https://api.openai.com/v1/chat/completions",
+        prompt="Describe this image in sentences in a single paragraph. Focus on key visual elements, data, diagrams, charts, or important details that would be useful for understanding the document.",
+        params={
+            "model": image_model,
+        },
+        headers={
+            "Authorization": f"Bearer {api_key}",
+        },
+        timeout=60,
+    )
+    
+    # Configure PDF pipeline with image annotation
+    pipeline_options = PdfPipelineOptions(
+        do_picture_description=True,
+        picture_description_options=picture_desc_api_option,
+        enable_remote_services=True,
+        generate_picture_images=True,
+        images_scale=images_scale,
+    )
+    
+    # Create converter with custom pipeline options
+    return DocumentConverter(
+        format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
+    )
+
+
+class _ConverterSlots:
+    """
+    Reusable converters for one configuration, each running one conversion at a time.
+    
+    Docling does not document convert() as thread-safe, so rather than share one
+    converter behind a lock, each conversion checks out a converter of its own.
+    Up to size converters are built, one at a time so concurrent first calls do not
+    load the models side by side; when all are busy, a conversion waits for one.
+    """
+    
+    def __init__(self, build: Callable[[], Any], size: int):
+        self._build = build
+        self._size = size
+        self._idle: List[Any] = []
+        self._built = 0
+        self._building = False
+        self._condition = threading.Condition()
+    
+    def grow(self, size: int) -> None:
+        """Allow up to size converters, if that is more than currently allowed"""
+        with self._condition:
+            if size > self._size:
+                self._size = size
+                self._condition.notify_all()
+    
+    @contextmanager
+    def checkout(self):
+        """Hold a converter for the duration of a with block, building one if there is room"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._idle or (self._built < self._size and not self._building)
+            )
+            if self._idle:
+                converter = self._idle.pop()
+            else:
+                converter = None
+                self._building = True
+        
+        if converter is None:
+            try:
+                converter = self._build()
+            finally:
+                with self._condition:
+                    self._building = False
+                    self._built += converter is not None
+                    self._condition.notify_all()
+        
+        try:
+            yield converter
+        finally:
+            with self._condition:
+                self._idle.append(converter)
+                self._condition.notify()
+
+
+def _convert(slots: _ConverterSlots, input_source: str):
+    """Convert a document with a converter checked out of slots"""
+    with slots.checkout() as converter:
+        return converter.convert(input_source)
+
+
+def _convert_all(slots: _ConverterSlots, input_sources: List[str]) -> list:
+    """Convert several documents in one convert_all() call, collecting failures instead of raising"""
+    with slots.checkout() as converter:
+        return list(converter.convert_all(input_sources, raises_on_error=False))
+
+
+# Converter slots shared by every processor, keyed by the options the converters are
+# built with; building one loads models and registers pipelines, so converters are
+# kept and reused rather than built per document
+_CONVERTER_CACHE: Dict[tuple, _ConverterSlots] = {}
+_CONVERTER_CACHE_LOCK = threading.Lock()
+_CONVERTER_CACHE_SIZE = 4
+
+# Error text that marks a conversion failure as a transient rate limit worth retrying; a
+# bare 429 only counts next to "status" or "HTTP", so digits in file names or sizes do not
+_RETRIABLE_RE = re.compile(
+    r"rate ?limit|too many requests|quota|\b(?:status(?: code)?|http(?:/[\d.]+)?)[\s:=]*429\b",
+    re.IGNORECASE
+)
+
+
+def _is_retriable(error: Exception) -> bool:
+    """Whether an error is a rate limit from the OpenAI or Docling backends"""
+    # HTTP client errors (httpx, requests, openai) carry the status code directly
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    if status is not None:
+        return status == 429
+    return "RateLimit" in type(error).__name__ or _RETRIABLE_RE.search(str(error)) is not None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Jittered exponential delay, in seconds, before retry number attempt + 1"""
+    return min(cap, base * 2 ** attempt) + random.random() * 0.25
+
+
+async def _with_backoff(call, max_attempts: int = 3, base: float = 1.0, cap: float = 30.0):
+    """
+    Await call(), retrying rate-limit errors with jittered exponential backoff.
+    
+    Args:
+        call: Zero-argument callable returning an awaitable
+        max_attempts: Total number of attempts before the error is raised
+        base: Delay before the first retry, in seconds
+        cap: Upper bound on any single delay, in seconds
+    """
+    for attempt in range(max_attempts):
+        try:
+            return await call()
+        except Exception as e:
+            if attempt == max_attempts - 1 or not _is_retriable(e):
+                raise
+            await asyncio.sleep(backoff_delay(attempt, base, cap))
+
 class DoclingProcessor:
     """Thread-safe Docling processing with batch capabilities"""
     
@@ -49,65 +248,24 @@ class DoclingProcessor:
             Dictionary with conversion results
         """
         try:
-            # Step 1: Import Docling
-            from docling.document_converter import DocumentConverter
-            from docling.datamodel.base_models import InputFormat
-            from docling.datamodel.pipeline_options import PdfPipelineOptions, PictureDescriptionApiOptions
-            from docling.document_converter import PdfFormatOption
-            
-            # Step 2: Auto-detect input type if needed
+            # Step 1: Auto-detect input type if needed
             if input_type == "auto":
-                if input_source.startswith(("http://", "https://")):
-                    input_type = "url"
-                elif os.path.exists(input_source):
-                    input_type = "file"
-                else:
-                    input_type = "base64"
+                input_type = _detect_input_type(input_source)
             
-            # Step 3: Configure converter based on options
-            if self.annotate_images:
-                # Get API key and model from environment
-                api_key = os.getenv("OPENAI_API_KEY")
-                image_model = os.getenv("IMAGE_MODEL", "gpt-4o-mini")
-                
-                if not api_key:
-                    return {
-                        "success": False,
-                        "error": "OPENAI_API_KEY environment variable is required for image annotation but is not set"
-                    }
-                
-                # Configure picture description options
-                picture_desc_api_option = PictureDescriptionApiOptions(
-                    url="https://api.openai.com/v1/chat/completions",
-                    prompt="Describe this image in sentences in a single paragraph. Focus on key visual elements, data, diagrams, charts, or important details that would be useful for understanding the document.",
-                    params={
-                        "model": image_model,
-                    },
-                    headers={
-                        "Authorization": f"Bearer {api_key}",
-                    },
-                    timeout=60,
-                )
-                
-                # Configure PDF pipeline with image annotation
-                pipeline_options = PdfPipelineOptions(
-                    do_picture_description=True,
-                    picture_description_options=picture_desc_api_option,
-                    enable_remote_services=True,
-                    generate_picture_images=True,
-                    images_scale=self.images_scale,
-                )
-                
-                # Create converter with custom pipeline options
-                converter = DocumentConverter(
-                    format_options={InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)}
-                )
-            else:
-                # Standard converter without image annotation
-                converter = DocumentConverter()
+            # Step 2: Get the converters for this configuration
+            slots = self._get_converter_slots()
+            if slots is None:
+                return {
+                    "success": False,
+                    "error": "OPENAI_API_KEY environment variable is required for image annotation but is not set"
+                }
             
-            # Step 4: Convert the document
-            conv_result = converter.convert(input_source)
+            # Step 3: Convert the document on the processor's executor, retrying rate-limit errors
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            conv_result = await _with_backoff(
+                lambda: loop.run_in_executor(executor, _convert, slots, input_source)
+            )
             document = conv_result.document
             
             if not document:
@@ -116,16 +274,10 @@ class DoclingProcessor:
                     "error": "Docling conversion produced no document"
                 }
             
-            # Step 5: Export to markdown
-            if self.annotate_images:
-                markdown_output = document.export_to_markdown(
-                    mark_annotations=True,
-                    include_annotations=True
-                )
-            else:
-                markdown_output = document.export_to_markdown()
+            # Step 4: Export to markdown
+            markdown_output = await loop.run_in_executor(executor, self._export_markdown, document)
             
-            # Step 6: Prepare result
+            # Step 5: Prepare result
             result = {
                 "success": True,
                 "input_source": input_source,
@@ -146,6 +298,73 @@ class DoclingProcessor:
                 "error": f"Docling conversion failed: {str(e)}"
             }
     
+    async def convert_documents(self, input_sources: List[str], input_types: List[str]) -> List[Dict[str, Any]]:
+        """
+        Convert several documents with a single convert_all() call.
+        
+        Docling sets up its pipelines once per call rather than once per document.
+        A document that fails to convert gets a failure entry; the others still
+        convert.
+        
+        Args:
+            input_sources: File paths, URLs, or base64 content
+            input_types: Type of each input ('file', 'url', 'base64')
+            
+        Returns:
+            One result dictionary per input, in input order, shaped like convert_document's
+        """
+        try:
+            # Step 1: Get the converters for this configuration
+            slots = self._get_converter_slots()
+            if slots is None:
+                error = "OPENAI_API_KEY environment variable is required for image annotation but is not set"
+                return [{"success": False, "error": error} for _ in input_sources]
+            
+            # Step 2: Convert every document on one converter, retrying rate-limit errors
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            conv_results = await _with_backoff(
+                lambda: loop.run_in_executor(executor, _convert_all, slots, input_sources)
+            )
+            
+            # Step 3: Export the converted documents to markdown in one executor call
+            documents = [
+                conv_result.document if conv_result.status.name in ("SUCCESS", "PARTIAL_SUCCESS") else None
+                for conv_result in conv_results
+            ]
+            markdown_outputs = await loop.run_in_executor(
+                executor,
+                lambda: [self._export_markdown(document) if document else None for document in documents]
+            )
+        except Exception as e:
+            return [{"success": False, "error": f"Docling conversion failed: {str(e)}"} for _ in input_sources]
+        
+        # Step 4: Prepare one result per document
+        results = []
+        for input_source, input_type, conv_result, document, markdown_output in zip(
+            input_sources, input_types, conv_results, documents, markdown_outputs
+        ):
+            if not document:
+                errors = "; ".join(error.error_message for error in conv_result.errors)
+                results.append({
+                    "success": False,
+                    "error": f"Docling conversion failed: {errors or conv_result.status.name}"
+                })
+                continue
+            
+            results.append({
+                "success": True,
+                "input_source": input_source,
+                "input_type": input_type,
+                "markdown_content": markdown_output,
+                "content_length": len(markdown_output),
+                "annotated_images": self.annotate_images,
+                "external_images": self.save_images_as_files,
+                "conversion_result": conv_result,
+                "document": document
+            })
+        return results
+    
     async def convert_batch(self, input_sources: List[str]) -> List[Dict[str, Any]]:
         """
         Convert multiple documents concurrently.
@@ -156,19 +375,101 @@ class DoclingProcessor:
         Returns:
             List of conversion results
         """
-        if not self.executor:
-            self.executor = asyncio.get_event_loop().run_in_executor(None, lambda: None)
+        # Each conversion's blocking work runs on the shared executor, so at most
+        # max_workers documents convert at once
+        return await asyncio.gather(
+            *(self.convert_document(source) for source in input_sources),
+            return_exceptions=True
+        )
+    
+    def _get_converter_slots(self) -> Optional[_ConverterSlots]:
+        """
+        Get the shared converters for this processor's configuration.
+        
+        Returns:
+            The configuration's _ConverterSlots, allowing at least max_workers
+            converters, or None when image annotation is enabled but
+            OPENAI_API_KEY is not set. Converters are built on first checkout.
+        """
+        # Step 1: Work out the configuration the converters are built with
+        if self.annotate_images:
+            # Get API key and model from environment
+            api_key = os.getenv("OPENAI_API_KEY")
+            image_model = os.getenv("IMAGE_MODEL", "gpt-4o-mini")
+            
+            if not api_key:
+                return None
+            
+            cache_key = (True, self.images_scale, image_model, api_key)
+        else:
+            cache_key = (False,)
         
-        loop = asyncio.get_event_loop()
-        tasks = [
-            loop.run_in_executor(self.executor, self._convert_single_sync, source)
-            for source in input_sources
-        ]
-        return await asyncio.gather(*tasks, return_exceptions=True)
+        # Step 2: Reuse the configuration's slots, registering them on first use
+        with _CONVERTER_CACHE_LOCK:
+            slots = _CONVERTER_CACHE.get(cache_key)
+            if slots is None:
+                if len(_CONVERTER_CACHE) >= _CONVERTER_CACHE_SIZE:
+                    # Evict the oldest configuration
+                    del _CONVERTER_CACHE[next(iter(_CONVERTER_CACHE))]
+                slots = _CONVERTER_CACHE[cache_key] = _ConverterSlots(
+                    partial(_build_converter, *cache_key), self.max_workers
+                )
+        
+        slots.grow(self.max_workers)
+        return slots
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the processor's thread pool, creating it on first use"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="docling"
+            )
+        return self.executor
+    
+    def _export_markdown(self, document) -> str:
+        """Export a Docling document to markdown, with annotations when enabled"""
+        if self.annotate_images:
+            return document.export_to_markdown(
+                mark_annotations=True,
+                include_annotations=True
+            )
+        return document.export_to_markdown()
     
-    def _convert_single_sync(self, input_source: str) -> Dict[str, Any]:
-        """Synchronous wrapper for single document conversion"""
-        return asyncio.run(self.convert_document(input_source))
+    def close(self) -> None:
+        """Shut down the processor's thread pool without waiting; running work still finishes"""
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            executor.shutdown(wait=False)
+    
+    async def aclose(self) -> None:
+        """Shut down the processor's thread pool, waiting for running conversions"""
+        if self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True)
+    
+    async def save_markdown_batch(self, documents: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Save several documents from a single writer thread.
+        
+        The writes run one after another off the event loop, so a large batch does
+        not open a thread per document.
+        
+        Args:
+            documents: (document, base_filename) pairs to save
+        
+        Returns:
+            List of save results in the same order as documents
+        """
+        if not documents:
+            return []
+        
+        return await asyncio.to_thread(
+            lambda: [
+                self.save_markdown(document, "", base_filename)
+                for document, base_filename in documents
+            ]
+        )
     
     def save_markdown(self, document, output_path: str, base_filename: str = None) -> Dict[str, Any]:
         """
@@ -210,57 +511,18 @@ class DoclingProcessor:
                 try:
                     from docling_core.types.doc.document import ImageRefMode
                     
-                    # Change to the document folder to avoid nested paths
-                    original_cwd = os.getcwd()
-                    try:
-                        # Change to the document's output directory
-                        os.chdir(output_dir)
-                        
-                        # Save with just the filename (not full path)
-                        document.save_as_markdown(
-                            output_filename,
-                            image_mode=ImageRefMode.REFERENCED,
-                            include_annotations=self.annotate_images
-                        )
-                        
-                        # Move images from artifacts folder to images subfolder
-                        artifacts_folder = Path(f"{base_filename}_artifacts")
-                        if artifacts_folder.exists() and artifacts_folder.is_dir():
-                            # Create images subfolder
-                            images_folder = Path("images")
-                            images_folder.mkdir(exist_ok=True)
-                            
-                            # Move all images to the images folder
-                            for image_file in artifacts_folder.glob("*"):
-                                if image_file.is_file():
-                                    image_file.rename(images_folder / image_file.name)
-                            
-                            # Remove the now-empty artifacts folder
-                            artifacts_folder.rmdir()
-                            
-                            # Update markdown to use images/ folder path
-                            with open(output_filename, "r", encoding="utf-8") as f:
-                                markdown_content = f.read()
-                            
-                            # Replace references from "folder_artifacts/image.png" to "images/image.png"
-                            markdown_content = markdown_content.replace(
-                                f"{base_filename}_artifacts\\",
-                                "images/"
-                            ).replace(
-                                f"{base_filename}_artifacts/",
-                                "images/"
-                            )
-                            
-                            # Write updated markdown
-                            with open(output_filename, "w", encoding="utf-8") as f:
-                                f.write(markdown_content)
-                    finally:
-                        # Always restore original working directory
-                        os.chdir(original_cwd)
+                    # Write images straight into the document's images folder. Docling resolves a
+                    # relative artifacts path against the markdown file's folder and links the
+                    # images relative to it, so no working-directory change is needed
+                    document.save_as_markdown(
+                        output_path,
+                        artifacts_dir=Path("images"),
+                        image_mode=ImageRefMode.REFERENCED,
+                        include_annotations=self.annotate_images
+                    )
                     
-                    # Read the saved markdown for preview
-                    with open(output_path, "r", encoding="utf-8") as f:
-                        markdown_output = f.read()
+                    # Measure the saved markdown in chunks rather than reading it whole
+                    content_length = _count_characters(output_path)
                 except ImportError as e:
                     return {
                         "success": False,
@@ -268,23 +530,18 @@ class DoclingProcessor:
                     }
             else:
                 # Export to markdown with inline/embedded images
-                if self.annotate_images:
-                    markdown_output = document.export_to_markdown(
-                        mark_annotations=True,
-                        include_annotations=True
-                    )
-                else:
-                    markdown_output = document.export_to_markdown()
+                markdown_output = self._export_markdown(document)
                 
                 # Write markdown to file
                 with open(output_path, "w", encoding="utf-8") as f:
                     f.write(markdown_output)
+                content_length = len(markdown_output)
             
             return {
                 "success": True,
                 "output_path": str(output_path),
                 "output_directory": str(output_dir),
-                "content_length": len(markdown_output),
+                "content_length": content_length,
                 "message": f"Successfully saved markdown to {output_path}"
             }
             
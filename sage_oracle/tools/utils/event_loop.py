@@ -0,0 +1,37 @@
+"""
+Persistent per-thread event loops shared by the Sage Oracle tools.
+"""
+
+import asyncio
+import threading
+
+# uvloop is optional (not available on Windows); fall back to the stdlib loop
+try:
+    import uvloop
+    _new_event_loop = uvloop.new_event_loop
+except ImportError:
+    _new_event_loop = asyncio.new_event_loop
+
+# One loop per thread: tool calls may run on several threads at once, and a loop
+# cannot run_until_complete while another thread is already running it
+_LOCAL = threading.local()
+
+
+def run_coroutine(coro):
+    """
+    Run a coroutine to completion on the calling thread's loop, created once and reused.
+    
+    Args:
+        coro: Coroutine to execute
+        
+    Returns:
+        The coroutine's result
+    """
+    loop = getattr(_LOCAL, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _LOCAL.loop = _new_event_loop()
+        # Python 3.12+: tasks run eagerly until their first real suspension, so
+        # ones that finish without blocking never go through the scheduler
+        if hasattr(asyncio, "eager_task_factory"):
+            loop.set_task_factory(asyncio.eager_task_factory)
+    return loop.run_until_complete(coro)
@@ -0,0 +1,54 @@
+"""
+Filename helpers shared by the Sage Oracle tools for naming markdown output.
+"""
+
+import re
+import string
+from functools import lru_cache
+from typing import Tuple
+from urllib.parse import urlparse
+
+# Translation table mapping every Latin-1 character outside [a-zA-Z0-9_-] to '_'
+_FILENAME_ALLOWED = frozenset(string.ascii_letters + string.digits + "_-")
+_FILENAME_SANITIZE = str.maketrans({
+    chr(i): "_" for i in range(256) if chr(i) not in _FILENAME_ALLOWED
+})
+_NON_LATIN1_RE = re.compile(r'[^\x00-\xff]')
+
+# Characters that need urlparse's full handling (query, fragment, userinfo, params, IPv6, whitespace)
+_URL_SLOW_CHARS = frozenset('?#@;[ \t\r\n')
+
+
+def sanitize_filename(name: str) -> str:
+    """Replace every character outside [a-zA-Z0-9_-] with an underscore"""
+    name = name.translate(_FILENAME_SANITIZE)
+    if not name.isascii():
+        # Characters beyond Latin-1 are not in the table
+        name = _NON_LATIN1_RE.sub("_", name)
+    return name
+
+
+def split_url(url: str) -> Tuple[str, str, str]:
+    """Split a URL into (scheme, netloc, path), matching urlparse for plain URLs"""
+    scheme, sep, rest = url.partition('://')
+    if not sep or not scheme.isalpha() or not _URL_SLOW_CHARS.isdisjoint(url):
+        parsed = urlparse(url)
+        return parsed.scheme, parsed.netloc, parsed.path
+    
+    netloc, slash, path = rest.partition('/')
+    return scheme.lower(), netloc, slash + path
+
+
+@lru_cache(maxsize=1024)
+def base_filename_for_url(url: str) -> str:
+    """Derive a sanitized base filename from a URL's last path segment or domain"""
+    _, netloc, path = split_url(url)
+    
+    if path:
+        filename = path.rpartition('/')[2]
+        if filename:
+            return sanitize_filename(filename.partition('.')[0])
+    
+    # Fallback to domain name
+    domain = netloc.replace('www.', '')
+    return sanitize_filename(domain)
@@ -3,19 +3,71 @@ Base input source abstraction for different document input types.
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from dataclasses import dataclass
+import os
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Tuple
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+from ..filenames import split_url
 
-@dataclass
+@dataclass(slots=True)
 class DocumentInput:
     """Represents a document input with metadata"""
     source: str
     source_type: str
-    metadata: Dict[str, Any] = None
+    # Builds the metadata from the document the first time it is read, so sources
+    # need not build it for every document they enumerate
+    metadata_factory: Optional[Callable[["DocumentInput"], Dict[str, Any]]] = field(default=None, repr=False, compare=False)
+    # Markdown output name, computed once when the source enumerates the document
+    base_filename: Optional[str] = None
+    _metadata: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
-    def __post_init__(self):
-        if self.metadata is None:
-            self.metadata = {}
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Document metadata, built by metadata_factory on first access"""
+        if self._metadata is None:
+            self._metadata = self.metadata_factory(self) if self.metadata_factory is not None else {}
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, metadata: Dict[str, Any]) -> None:
+        self._metadata = metadata
+
+def document_key(document: DocumentInput) -> str:
+    """Canonical identity of a document source, used to drop duplicates"""
+    source = document.source
+    if document.source_type == "url":
+        # Scheme and host are case-insensitive, and a trailing slash names the same page
+        if '?' in source or ';' in source:
+            parts = urlsplit(source)
+            scheme, netloc, path, query = parts.scheme, parts.netloc, parts.path, parts.query
+        else:
+            # No query, and no params for urlparse to split off the path
+            scheme, netloc, path = split_url(source)
+            query = ""
+        path = path.rstrip('/')
+        query = f"?{query}" if query else ""
+        return f"{scheme.lower()}://{netloc.lower()}{path}{query}"
+    if document.source_type == "file":
+        return os.path.normcase(os.path.abspath(source))
+    return source
+
+
+def dedupe_documents(documents: List[DocumentInput]) -> Tuple[List[DocumentInput], int]:
+    """
+    Drop documents whose canonical source was already seen, keeping the first occurrence.
+    
+    Returns:
+        The unique documents and the number of duplicates removed
+    """
+    seen = set()
+    unique = []
+    for document in documents:
+        key = document_key(document)
+        if key not in seen:
+            seen.add(key)
+            unique.append(document)
+    return unique, len(documents) - len(unique)
+
 
 class BaseInputSource(ABC):
     """Abstract base for different input sources"""
@@ -25,6 +77,11 @@ class BaseInputSource(ABC):
         """Get list of documents to process"""
         pass
     
+    async def iter_documents(self) -> AsyncIterator[DocumentInput]:
+        """Yield documents to process; sources that can discover them incrementally override this"""
+        for document in await self.get_documents():
+            yield document
+    
     @abstractmethod
     def get_source_type(self) -> str:
         """Return source type identifier"""
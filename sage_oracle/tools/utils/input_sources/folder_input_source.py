@@ -3,10 +3,44 @@ Folder-based input source for processing documents from local directories.
 """
 
 import os
+import re
+import stat
+import asyncio
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
 from .base_input_source import BaseInputSource, DocumentInput
 
+# Documents read from the folder scan per worker-thread hop when streaming
+_SCAN_CHUNK_SIZE = 64
+
+# A pattern of the form "*.ext": matched by extension instead of globbing
+_SIMPLE_PATTERN_RE = re.compile(r'^\*\.([^*?\[\]./\\]+)$')
+
+
+def _simple_suffixes(file_patterns: List[str]) -> Optional[frozenset]:
+    """Return the extensions named by plain "*.ext" patterns, or None if any pattern is more general"""
+    suffixes = []
+    for pattern in file_patterns:
+        match = _SIMPLE_PATTERN_RE.match(pattern)
+        if match is None:
+            return None
+        suffixes.append(os.path.normcase(match.group(1)))
+    return frozenset(suffixes)
+
+
+def _file_metadata(document: DocumentInput) -> Dict[str, Any]:
+    """Build a file document's metadata, stat'ing the file only when it is asked for"""
+    file_path = Path(document.source)
+    file_stat = file_path.stat()
+    return {
+        "filename": file_path.name,
+        "file_extension": file_path.suffix,
+        "file_size": file_stat.st_size,
+        "modified_time": file_stat.st_mtime
+    }
+
+
 class FolderInputSource(BaseInputSource):
     """Process documents from a folder"""
     
@@ -24,34 +58,64 @@ class FolderInputSource(BaseInputSource):
     
     async def get_documents(self) -> List[DocumentInput]:
         """Scan folder and return document list"""
+        if self._documents_cache is None:
+            # Scan in a worker thread so the event loop stays free; cache the results
+            self._documents_cache = await asyncio.to_thread(lambda: list(self._scan()))
+        return self._documents_cache
+    
+    async def iter_documents(self) -> AsyncIterator[DocumentInput]:
+        """Yield documents as the folder scan finds them, without building the full list"""
         if self._documents_cache is not None:
-            return self._documents_cache
-        
-        documents = []
+            for document in self._documents_cache:
+                yield document
+            return
         
+        # Scan in a worker thread a chunk at a time, so the directory reads stay off
+        # the event loop while only one chunk is held in memory
+        scan = self._scan()
+        while True:
+            chunk = await asyncio.to_thread(lambda: list(islice(scan, _SCAN_CHUNK_SIZE)))
+            if not chunk:
+                return
+            for document in chunk:
+                yield document
+    
+    def _scan(self) -> Iterator[DocumentInput]:
+        """Scan the folder for files matching the configured patterns"""
         if not self.folder_path.exists():
             raise FileNotFoundError(f"Folder not found: {self.folder_path}")
         
         if not self.folder_path.is_dir():
             raise NotADirectoryError(f"Path is not a directory: {self.folder_path}")
         
+        for file_path in self._matching_files():
+            yield DocumentInput(
+                source=str(file_path),
+                source_type="file",
+                metadata_factory=_file_metadata,
+                base_filename=file_path.stem
+            )
+    
+    def _matching_files(self) -> Iterator[Path]:
+        """Yield each matching file once"""
+        suffixes = _simple_suffixes(self.file_patterns)
+        
+        if suffixes is not None:
+            # Plain "*.ext" patterns: one directory pass filtered by extension
+            with os.scandir(self.folder_path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if '.' in name and os.path.normcase(name.rpartition('.')[2]) in suffixes and entry.is_file():
+                        yield self.folder_path / name
+            return
+        
+        # General patterns: glob each one; overlapping patterns match the same file more than once
+        seen = set()
         for pattern in self.file_patterns:
             for file_path in self.folder_path.glob(pattern):
-                if file_path.is_file():
-                    documents.append(DocumentInput(
-                        source=str(file_path),
-                        source_type="file",
-                        metadata={
-                            "filename": file_path.name,
-                            "file_extension": file_path.suffix,
-                            "file_size": file_path.stat().st_size,
-                            "modified_time": file_path.stat().st_mtime
-                        }
-                    ))
-        
-        # Cache the results
-        self._documents_cache = documents
-        return documents
+                if file_path not in seen and file_path.is_file():
+                    seen.add(file_path)
+                    yield file_path
     
     def get_source_type(self) -> str:
         return "folder"
@@ -61,17 +125,23 @@ class FolderInputSource(BaseInputSource):
         if self._documents_cache is not None:
             return len(self._documents_cache)
         
-        count = 0
-        for pattern in self.file_patterns:
-            count += len(list(self.folder_path.glob(pattern)))
-        return count
+        if not self.folder_path.is_dir():
+            return 0
+        return sum(1 for _ in self._matching_files())
     
     def get_folder_info(self) -> Dict[str, Any]:
         """Get information about the folder"""
+        # One stat answers both exists and is_directory
+        try:
+            is_directory = stat.S_ISDIR(os.stat(self.folder_path).st_mode)
+            exists = True
+        except OSError:
+            exists = is_directory = False
+        
         return {
             "folder_path": str(self.folder_path),
             "file_patterns": self.file_patterns,
-            "exists": self.folder_path.exists(),
-            "is_directory": self.folder_path.is_dir() if self.folder_path.exists() else False,
-            "estimated_document_count": self.get_source_count()
+            "exists": exists,
+            "is_directory": is_directory,
+            "estimated_document_count": self.get_source_count() if is_directory else 0
         }
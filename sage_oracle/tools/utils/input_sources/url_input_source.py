@@ -3,10 +3,169 @@ URL-based input source for processing documents from web URLs and sitemaps.
 """
 
 import asyncio
-from typing import List, Dict, Any
-from urllib.parse import urlparse
+import atexit
+import gzip
+import ssl
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Dict, Any, Optional, Tuple
+from urllib.request import HTTPSHandler, OpenerDirector, Request, build_opener
+from ..filenames import base_filename_for_url, split_url
 from .base_input_source import BaseInputSource, DocumentInput
 
+# Nested sitemap indexes are followed at most this many levels deep
+_MAX_SITEMAP_DEPTH = 3
+# Nested sitemaps fetched at once
+_SITEMAP_FETCH_CONCURRENCY = 8
+_SITEMAP_TIMEOUT = 30
+_SITEMAP_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; SageOracle sitemap reader)"}
+
+# Opener and fetch threads shared by every URLInputSource, created on first use; the
+# opener's single SSL context saves loading the CA bundle for every HTTPS fetch
+_SITEMAP_OPENER: Optional[OpenerDirector] = None
+_SITEMAP_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_SITEMAP_SHARED_LOCK = threading.Lock()
+
+
+def _local_name(tag: str) -> str:
+    """Strip the namespace from an element tag"""
+    return tag.rpartition('}')[2]
+
+
+def _iter_sitemap_entries(stream) -> Iterator[Tuple[bool, str]]:
+    """
+    Stream (is_sitemap_index_entry, loc) pairs out of sitemap XML.
+    
+    Uses lxml's iterparse when available, otherwise the standard library's, and
+    clears each entry once read so memory stays flat for large sitemaps.
+    """
+    try:
+        from lxml import etree
+        events = etree.iterparse(stream, events=("end",), tag=("{*}url", "{*}sitemap"))
+        prune_siblings = True
+    except ImportError:
+        import xml.etree.ElementTree as etree
+        events = etree.iterparse(stream, events=("end",))
+        prune_siblings = False
+    
+    for _, elem in events:
+        name = _local_name(elem.tag)
+        if name != "url" and name != "sitemap":
+            continue
+        
+        for child in elem:
+            if _local_name(child.tag) == "loc" and child.text:
+                yield name == "sitemap", child.text.strip()
+                break
+        
+        elem.clear()
+        if prune_siblings:
+            # Drop already-read entries from the tree as well
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+
+def _sitemap_opener() -> OpenerDirector:
+    """Return the shared opener used for sitemap fetches"""
+    global _SITEMAP_OPENER
+    with _SITEMAP_SHARED_LOCK:
+        if _SITEMAP_OPENER is None:
+            _SITEMAP_OPENER = build_opener(HTTPSHandler(context=ssl.create_default_context()))
+        return _SITEMAP_OPENER
+
+
+def _sitemap_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool that fetches nested sitemaps"""
+    global _SITEMAP_EXECUTOR
+    with _SITEMAP_SHARED_LOCK:
+        if _SITEMAP_EXECUTOR is None:
+            _SITEMAP_EXECUTOR = ThreadPoolExecutor(max_workers=_SITEMAP_FETCH_CONCURRENCY, thread_name_prefix="sitemap")
+            atexit.register(_SITEMAP_EXECUTOR.shutdown, wait=False, cancel_futures=True)
+        return _SITEMAP_EXECUTOR
+
+
+def _open_sitemap(url: str):
+    """Open a sitemap URL, returning the response and a stream that gunzips it when needed"""
+    response = _sitemap_opener().open(Request(url, headers=_SITEMAP_HEADERS), timeout=_SITEMAP_TIMEOUT)
+    stream = response
+    if response.peek(2)[:2] == b"\x1f\x8b":
+        stream = gzip.GzipFile(fileobj=response)
+    return response, stream
+
+
+def _read_sitemap_entries(url: str) -> List[Tuple[bool, str]]:
+    """Fetch one nested sitemap and return all of its entries"""
+    response, stream = _open_sitemap(url)
+    with response:
+        return list(_iter_sitemap_entries(stream))
+
+
+def _iter_sitemap_urls(sitemap_url: str) -> Iterator[str]:
+    """
+    Fetch a sitemap or sitemap index (optionally gzipped) and yield the page URLs it lists.
+    
+    The top-level sitemap is streamed, so nothing past the last URL consumed is
+    downloaded or parsed. Nested sitemaps are fetched a few at a time in worker
+    threads and read in document order. URLs repeated within the sitemap are
+    yielded once.
+    """
+    pending = deque()
+    seen = {sitemap_url}
+    seen_urls = set()
+    
+    def page_urls(entries, depth):
+        for is_index, loc in entries:
+            if not is_index:
+                if loc not in seen_urls:
+                    seen_urls.add(loc)
+                    yield loc
+            elif depth < _MAX_SITEMAP_DEPTH and loc not in seen:
+                seen.add(loc)
+                pending.append((loc, depth + 1))
+    
+    response, stream = _open_sitemap(sitemap_url)
+    with response:
+        yield from page_urls(_iter_sitemap_entries(stream), 0)
+    
+    if not pending:
+        return
+    
+    executor = _sitemap_executor()
+    fetches = []
+    try:
+        while pending:
+            window = [pending.popleft() for _ in range(min(len(pending), _SITEMAP_FETCH_CONCURRENCY))]
+            fetches = [(url, depth, executor.submit(_read_sitemap_entries, url)) for url, depth in window]
+            for url, depth, fetch in fetches:
+                try:
+                    entries = fetch.result()
+                except Exception as e:
+                    print(f"Warning: Failed to read nested sitemap {url}: {str(e)}")
+                    continue
+                yield from page_urls(entries, depth)
+    finally:
+        # A caller that stopped early does not wait for fetches it no longer needs
+        for _, _, fetch in fetches:
+            fetch.cancel()
+
+
+def _read_sitemap_urls(sitemap_url: str, limit: Optional[int] = None) -> List[str]:
+    """Return up to limit page URLs from a sitemap, stopping the download once enough are read"""
+    return list(islice(_iter_sitemap_urls(sitemap_url), limit))
+
+
+def _url_metadata(document: DocumentInput) -> Dict[str, Any]:
+    """Build a URL document's metadata from its source"""
+    scheme, domain, _ = split_url(document.source)
+    return {
+        "url": document.source,
+        "domain": domain,
+        "scheme": scheme
+    }
+
+
 class URLInputSource(BaseInputSource):
     """Process documents from URLs and sitemaps"""
     
@@ -22,45 +181,52 @@ class URLInputSource(BaseInputSource):
         self.sitemap_url = sitemap_url
         self._documents_cache = None
     
-    async def get_documents(self) -> List[DocumentInput]:
-        """Return URL documents, optionally extracting from sitemap"""
+    async def get_documents(self, limit: Optional[int] = None) -> List[DocumentInput]:
+        """
+        Return URL documents, optionally extracting from sitemap.
+        
+        Args:
+            limit: Maximum number of documents to return; the sitemap is only read
+                until enough URLs have been found
+        """
         if self._documents_cache is not None:
-            return self._documents_cache
+            return self._documents_cache[:limit]
         
         documents = []
         
         # Add direct URLs
-        for url in self.urls:
+        for url in self.urls[:limit]:
             documents.append(DocumentInput(
                 source=url,
                 source_type="url",
-                metadata={
-                    "url": url,
-                    "domain": urlparse(url).netloc,
-                    "scheme": urlparse(url).scheme
-                }
+                metadata_factory=_url_metadata,
+                base_filename=base_filename_for_url(url)
             ))
         
         # Extract URLs from sitemap if provided
-        if self.sitemap_url:
-            sitemap_urls = await self._extract_sitemap_urls()
+        remaining = None if limit is None else limit - len(documents)
+        if self.sitemap_url and remaining != 0:
+            sitemap_urls = await self._extract_sitemap_urls(remaining)
             for url in sitemap_urls:
                 documents.append(DocumentInput(
                     source=url,
                     source_type="url",
-                    metadata={
-                        "url": url,
-                        "domain": urlparse(url).netloc,
-                        "scheme": urlparse(url).scheme,
-                        "source": "sitemap",
-                        "sitemap_url": self.sitemap_url
-                    }
+                    metadata_factory=self._sitemap_url_metadata,
+                    base_filename=base_filename_for_url(url)
                 ))
         
-        # Cache the results
-        self._documents_cache = documents
+        # Cache the results; a limited read is not the full list, so it is not cached
+        if limit is None:
+            self._documents_cache = documents
         return documents
     
+    def _sitemap_url_metadata(self, document: DocumentInput) -> Dict[str, Any]:
+        """Build the metadata of a URL found in this source's sitemap"""
+        metadata = _url_metadata(document)
+        metadata["source"] = "sitemap"
+        metadata["sitemap_url"] = self.sitemap_url
+        return metadata
+    
     def get_source_type(self) -> str:
         return "url"
     
@@ -75,45 +241,11 @@ class URLInputSource(BaseInputSource):
             count += 50  # Conservative estimate
         return count
     
-    async def _extract_sitemap_urls(self) -> List[str]:
-        """Extract URLs from sitemap using the existing DiscoverUrlsMultiLevel tool"""
+    async def _extract_sitemap_urls(self, limit: Optional[int] = None) -> List[str]:
+        """Extract up to limit page URLs from the sitemap XML"""
         try:
-            # Import the existing tool
-            import sys
-            from pathlib import Path
-            
-            # Add the document_processor tools to the path
-            doc_processor_path = Path(__file__).parent.parent.parent.parent.parent / "document_processor" / "tools"
-            sys.path.append(str(doc_processor_path))
-            
-            from DiscoverUrlsMultiLevel import DiscoverUrlsMultiLevel
-            
-            # Use the existing tool to discover URLs
-            discoverer = DiscoverUrlsMultiLevel(
-                start_url=self.sitemap_url,
-                max_depth=1,  # Just get the sitemap URLs
-                max_urls_per_level=1000,  # Get all URLs from sitemap
-                exclude_patterns=[]  # No exclusions for sitemap
-            )
-            
-            result = discoverer.run()
-            
-            # Parse the result to extract URLs
-            urls = []
-            if isinstance(result, str):
-                # Parse the text output to extract URLs
-                lines = result.split('\n')
-                for line in lines:
-                    if '[Level 0]' in line and 'http' in line:
-                        # Extract URL from line like "[Level 0] [V] Visited: https://example.com"
-                        url_part = line.split(': ', 1)
-                        if len(url_part) > 1:
-                            url = url_part[1].strip()
-                            if url.startswith('http'):
-                                urls.append(url)
-            
-            return urls
-            
+            # Fetching and parsing block, so keep them off the event loop
+            return await asyncio.to_thread(_read_sitemap_urls, self.sitemap_url, limit)
         except Exception as e:
             print(f"Warning: Failed to extract URLs from sitemap {self.sitemap_url}: {str(e)}")
             return []
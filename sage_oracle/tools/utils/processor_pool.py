@@ -0,0 +1,175 @@
+"""
+Pool of reusable DoclingProcessor instances shared by the Sage Oracle tools.
+"""
+
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from .docling_processor import DoclingProcessor
+from .input_sources.base_input_source import DocumentInput
+from .concurrency.batch_processor import BatchResult, PipelineDocResult
+
+# (annotate_images, images_scale, save_images_as_files)
+PoolKey = Tuple[bool, int, bool]
+
+
+class ProcessorPool:
+    """
+    Check DoclingProcessor instances out and back in, keyed by their configuration.
+
+    The pool is shared by event loops on different threads, so the idle lists are
+    guarded by a lock. Idle processors hold no threads: a processor's executor is
+    shut down when it is checked in and recreated on its next conversion.
+    """
+
+    def __init__(self, max_idle: int = 16):
+        """
+        Initialize the processor pool.
+
+        Args:
+            max_idle: Maximum number of idle processors kept per configuration
+        """
+        self.max_idle = max_idle
+        self._idle: Dict[PoolKey, List[DoclingProcessor]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: PoolKey) -> DoclingProcessor:
+        """Take an idle processor for the configuration, or build one if none is free"""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()
+
+        annotate_images, images_scale, save_images_as_files = key
+        return DoclingProcessor(
+            annotate_images=annotate_images,
+            images_scale=images_scale,
+            save_images_as_files=save_images_as_files
+        )
+
+    def release(self, key: PoolKey, processor: DoclingProcessor) -> None:
+        """Close a processor's executor and return it to the pool, unless enough are already idle"""
+        processor.close()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(processor)
+
+    @asynccontextmanager
+    async def lease(self, key: PoolKey):
+        """Hold a processor for the duration of an async with block"""
+        processor = self.acquire(key)
+        try:
+            yield processor
+        finally:
+            self.release(key, processor)
+
+
+# Shared across tool invocations and the event loops of different threads
+processor_pool = ProcessorPool()
+
+
+async def process_one(document: DocumentInput, *,
+                      annotate_images: bool,
+                      images_scale: int,
+                      save_images_as_files: bool,
+                      pool: Optional[ProcessorPool] = None) -> Dict[str, Any]:
+    """
+    Convert a single document with a processor leased from the pool.
+
+    The pipeline tools bind the image options with functools.partial and pass the
+    result to BatchProcessor as the processor function.
+
+    Args:
+        document: Document to convert
+        annotate_images: Whether to use AI for image annotation
+        images_scale: Scale factor for generated images
+        save_images_as_files: Whether to save images as external files
+        pool: Pool to lease from; defaults to the shared processor_pool
+    """
+    key = (annotate_images, images_scale, save_images_as_files)
+    async with (pool or processor_pool).lease(key) as processor:
+        return await processor.convert_document(
+            input_source=document.source,
+            input_type=document.source_type
+        )
+
+
+async def process_many(documents: List[DocumentInput], *,
+                       annotate_images: bool,
+                       images_scale: int,
+                       save_images_as_files: bool,
+                       pool: Optional[ProcessorPool] = None) -> List[Dict[str, Any]]:
+    """
+    Convert several documents in one Docling call with a processor leased from the pool.
+
+    BatchProcessor passes lists of up to process_many.batch_size documents, taking
+    what is already pending rather than waiting for a full batch. Arguments are as
+    for process_one; one result is returned per document, in order.
+    """
+    key = (annotate_images, images_scale, save_images_as_files)
+    async with (pool or processor_pool).lease(key) as processor:
+        return await processor.convert_documents(
+            [document.source for document in documents],
+            [document.source_type for document in documents]
+        )
+
+
+# Documents BatchProcessor hands process_many per call
+process_many.batch_size = 8
+
+
+async def collect_results(batch_result: BatchResult,
+                          processor: DoclingProcessor, *,
+                          include_source_type: bool = False) -> List[PipelineDocResult]:
+    """
+    Turn a pipeline's batch of process_one or process_many results into its per-document entries.
+
+    The markdown of every converted document is saved from a single writer thread,
+    and the saved path is filled into that document's entry.
+
+    Args:
+        batch_result: Result of BatchProcessor.process_documents with process_one or process_many
+        processor: Processor whose save options are used to write the markdown
+        include_source_type: Whether successful entries report the detected input type
+    """
+    results = [None] * len(batch_result.results)
+    pending_saves = []
+    pending_indices = []
+    for i, result in enumerate(batch_result.results):
+        if result.success:
+            # Queue the markdown output for the writer
+            doc_result = result.result
+            if doc_result.get("success"):
+                pending_saves.append((doc_result["document"], result.document.base_filename))
+                pending_indices.append(i)
+
+                results[i] = PipelineDocResult(
+                    source=result.source,
+                    success=True,
+                    processing_time=result.processing_time,
+                    content_length=doc_result.get("content_length"),
+                    source_type=doc_result.get("input_type", "unknown") if include_source_type else None
+                )
+            else:
+                results[i] = PipelineDocResult(
+                    source=result.source,
+                    success=False,
+                    processing_time=result.processing_time,
+                    error=doc_result.get("error")
+                )
+        else:
+            results[i] = PipelineDocResult(
+                source=result.source,
+                success=False,
+                processing_time=result.processing_time,
+                error=result.error
+            )
+
+    # Save all markdown outputs from a single writer thread
+    save_results = await processor.save_markdown_batch(pending_saves)
+    for i, save_result in zip(pending_indices, save_results):
+        results[i].markdown_path = save_result.get("output_path")
+
+    return results
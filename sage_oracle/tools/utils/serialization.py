@@ -0,0 +1,59 @@
+"""
+JSON serialization helpers for Sage Oracle tool output.
+"""
+
+import json
+import datetime
+import dataclasses
+from typing import Any
+
+# Prefer orjson when available, falling back to the stdlib
+try:
+    import orjson
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize as indented UTF-8 JSON bytes, ready to write to a binary file"""
+        return orjson.dumps(
+            obj,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+    def dumps(obj: Any) -> str:
+        """Serialize tool output as indented, non-ASCII-escaped JSON"""
+        return dumps_bytes(obj).decode("utf-8")
+
+    def dumps_compact(obj: Any) -> str:
+        """Serialize machine-consumed tool output as compact JSON"""
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+except ImportError:
+    def _default(obj: Any) -> Any:
+        # Match orjson, which serializes dataclasses, datetimes and numpy arrays natively
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+            return obj.isoformat()
+        if hasattr(obj, "tolist"):
+            return obj.tolist()
+        return str(obj)
+
+    def dumps(obj: Any) -> str:
+        """Serialize tool output as indented, non-ASCII-escaped JSON"""
+        return json.dumps(obj, indent=2, ensure_ascii=False, default=_default)
+
+    def dumps_compact(obj: Any) -> str:
+        """Serialize machine-consumed tool output as compact JSON"""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=_default)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """Serialize as indented UTF-8 JSON bytes, ready to write to a binary file"""
+        return dumps(obj).encode("utf-8")
+
+
+def without_none(obj: Any) -> dict:
+    """Convert a dataclass result entry to a dict, leaving out fields that are None"""
+    return {
+        field.name: value
+        for field in dataclasses.fields(obj)
+        if (value := getattr(obj, field.name)) is not None
+    }
@@ -1,64 +1,87 @@
 """
 Structure validation test - checks code can be parsed without requiring API keys.
 """
-import ast
+import importlib.util
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 print("Validating Document Processing Agency Structure...")
 print("=" * 60)
 
+def has_current_bytecode(filepath):
+    """Check if the file's __pycache__ entry was compiled from its current source."""
+    # Same test as importlib: the pyc header must carry this interpreter's magic
+    # number and the source's exact mtime and size
+    try:
+        with open(importlib.util.cache_from_source(filepath), 'rb') as f:
+            header = f.read(16)
+        source_stat = os.stat(filepath)
+    except (OSError, NotImplementedError):
+        return False
+    if len(header) < 16 or header[:4] != importlib.util.MAGIC_NUMBER:
+        return False
+    # Hash-based pycs (flags != 0) would need the source hashed; just compile those
+    if int.from_bytes(header[4:8], 'little') != 0:
+        return False
+    return (int.from_bytes(header[8:12], 'little') == int(source_stat.st_mtime) & 0xFFFFFFFF
+            and int.from_bytes(header[12:16], 'little') == source_stat.st_size & 0xFFFFFFFF)
+
 def validate_python_file(filepath):
     """Check if a Python file has valid syntax."""
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            code = f.read()
-        ast.parse(code)
+        if has_current_bytecode(filepath):
+            return True, None
+        
+        # Compiling checks syntax without building a Python-level AST; compile takes
+        # the raw bytes and honours any PEP 263 encoding declaration itself
+        compile(Path(filepath).read_bytes(), filepath, 'exec', dont_inherit=True, optimize=2)
         return True, None
     except Exception as e:
         return False, str(e)
 
-# Test all tool files
+def list_existing(filepaths):
+    """Return the filepaths that exist, listing each directory once instead of stat'ing every file."""
+    by_directory = {}
+    for filepath in filepaths:
+        by_directory.setdefault(os.path.dirname(filepath), []).append(filepath)
+    
+    existing = set()
+    for directory, files in by_directory.items():
+        try:
+            with os.scandir(directory or ".") as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            continue
+        existing.update(filepath for filepath in files if os.path.basename(filepath) in names)
+    return existing
+
+def check_file(filepath):
+    """Return the report line for one expected file."""
+    if filepath not in existing_files:
+        return f"[MISSING] {filepath}"
+    if not filepath.endswith('.py'):
+        return f"[OK] {filepath} (exists)"
+    valid, error = validate_python_file(filepath)
+    if valid:
+        return f"[OK] {filepath}"
+    return f"[FAIL] {filepath}: {error}"
+
+# Tool files
 tool_files = [
     "document_processor/tools/CrawlAndProcessUrl.py",
     "document_processor/tools/SearchSimilarChunks.py",
     "document_processor/tools/ListCollections.py",
 ]
 
-print("\nValidating Tool Files:")
-print("-" * 60)
-for tool_file in tool_files:
-    if os.path.exists(tool_file):
-        valid, error = validate_python_file(tool_file)
-        if valid:
-            print(f"[OK] {tool_file}")
-        else:
-            print(f"[FAIL] {tool_file}: {error}")
-    else:
-        print(f"[MISSING] {tool_file}")
-
-# Test agent files
+# Agent files
 agent_files = [
     "document_processor/__init__.py",
     "document_processor/document_processor.py",
     "document_processor/instructions.md",
 ]
 
-print("\nValidating Agent Files:")
-print("-" * 60)
-for agent_file in agent_files:
-    if os.path.exists(agent_file):
-        if agent_file.endswith('.py'):
-            valid, error = validate_python_file(agent_file)
-            if valid:
-                print(f"[OK] {agent_file}")
-            else:
-                print(f"[FAIL] {agent_file}: {error}")
-        else:
-            print(f"[OK] {agent_file} (exists)")
-    else:
-        print(f"[MISSING] {agent_file}")
-
-# Test agency files
+# Agency files
 agency_files = [
     "agency.py",
     "requirements.txt",
@@ -67,20 +90,23 @@ agency_files = [
     "prd.txt",
 ]
 
-print("\nValidating Agency Files:")
-print("-" * 60)
-for agency_file in agency_files:
-    if os.path.exists(agency_file):
-        if agency_file.endswith('.py'):
-            valid, error = validate_python_file(agency_file)
-            if valid:
-                print(f"[OK] {agency_file}")
-            else:
-                print(f"[FAIL] {agency_file}: {error}")
-        else:
-            print(f"[OK] {agency_file} (exists)")
-    else:
-        print(f"[MISSING] {agency_file}")
+sections = [
+    ("Tool Files", tool_files),
+    ("Agent Files", agent_files),
+    ("Agency Files", agency_files),
+]
+
+# The checks are independent, so run them all at once and print in section order
+all_files = [filepath for _, files in sections for filepath in files]
+existing_files = list_existing(all_files)
+with ThreadPoolExecutor(max_workers=8) as executor:
+    report = dict(zip(all_files, executor.map(check_file, all_files)))
+
+for title, files in sections:
+    print(f"\nValidating {title}:")
+    print("-" * 60)
+    for filepath in files:
+        print(report[filepath])
 
 print("\n" + "=" * 60)
 print("Structure validation completed!")